@@ -1,173 +1,260 @@
-import matplotlib
-matplotlib.use('Agg')  
-
 import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-import seaborn as sns
-from datetime import datetime
 import os
+import argparse
+from storage import ColumnarDataset, iter_jsonl, newest_existing
+from metrics import METRICS, METRICS_DIRECTORY
+from correlation import DEFAULT_RESAMPLES, correlation_statistics
+from group_stats import group_statistics, save_group_table
+from records import compact_records
+from charts import bar_spec, histogram_spec, render_charts
+from sketches import SketchSet, merge_sketch_files
+from sqlite_store import DATABASE_FILE, RepositoryStore
+from stats_engine import DEFAULT_PERCENTILES, RQ_METRICS, compute_statistics
+
+DATA_FILES = [
+    "repositories_data_columns/schema.json",
+    "repositories_data.json",
+    "repositories_data.jsonl",
+    "repositories_data.jsonl.gz",
+    "repositories_data.jsonl.zst",
+]
 
-def load_data(filename="repositories_data.json"):
+def load_data(filename=None):
+    # Sem arquivo explícito, usa o conjunto de dados mais recente (colunar, JSON ou JSONL do modo --stream)
+    filename = filename or newest_existing(DATA_FILES) or DATA_FILES[1]
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            print(f"Carregados dados de {len(data)} repositórios.")
-            return data
+        if filename.endswith("schema.json"):
+            # Formato colunar: mapeado em memória, as colunas são lidas sob demanda
+            data = ColumnarDataset(os.path.dirname(filename))
+        elif ".jsonl" in filename:
+            data = compact_records(iter_jsonl(filename))
+        else:
+            with open(filename, "r", encoding="utf-8") as f:
+                # Os dicts do JSON viram um array estruturado; a análise lê os campos direto dele
+                data = compact_records(json.load(f))
+        print(f"Carregados dados de {len(data)} repositórios.")
+        return data
     except Exception as e:
         print(f"Erro ao carregar arquivo de dados: {str(e)}")
         return []
 
-def analyze_repository_age(data):
-    """RQ 01. Sistemas populares são maduros/antigos?"""
-    ages = [repo["age_days"] for repo in data]
-    ages_years = [age / 365 for age in ages]
-    
-    plt.figure(figsize=(10, 6))
-    plt.hist(ages_years, bins=20, color='skyblue', edgecolor='black')
-    plt.xlabel('Idade do Repositório (anos)')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Distribuição da Idade dos Repositórios Populares')
-    plt.grid(axis='y', alpha=0.75)
-    plt.tight_layout()
-    
-    os.makedirs("resultados", exist_ok=True)
-    plt.savefig('resultados/rq01_repository_age.png')
-    plt.close() 
+# Métricas de --enrich mostradas junto de cada RQ: (coluna, descrição)
+ENRICHMENT_METRICS = {
+    "rq02": [("merged_pull_requests_last_year", "pull requests aceitas no último ano")],
+    "rq03": [("releases_last_year", "releases no último ano"),
+             ("release_interval_days", "dias entre releases consecutivas")],
+}
+
+def enrichment_lines(stats, rq):
+    """Média e mediana das métricas de --enrich de uma RQ (nenhuma linha se os dados não as trazem)"""
+    lines = []
+    for name, label in ENRICHMENT_METRICS[rq]:
+        if name in stats.metrics:
+            lines.append(f"Média de {label}: {stats.mean(name):.2f}")
+            lines.append(f"Mediana de {label}: {stats.median(name):g}")
+    return lines
+
+def analyze_repository_age(data, stats=None, charts=True):
+    """RQ 01. Sistemas populares são maduros/antigos?
+
+    Cada analyze_* imprime as métricas e devolve a descrição do seu gráfico para render_charts
+    (ou False com charts=False, sem ler as colunas para o histograma).
+    """
+    stats = stats or compute_statistics(data)
+    chart = charts and histogram_spec(stats.histogram("age_days", scale=1 / 365), 'resultados/rq01_repository_age.png',
+                                      'skyblue', 'Idade do Repositório (anos)',
+                                      'Distribuição da Idade dos Repositórios Populares')
     
-    avg_age = sum(ages) / len(ages)
-    median_age = sorted(ages)[len(ages) // 2]
+    avg_age = stats.mean("age_days")
+    median_age = stats.median("age_days")
     
     print(f"RQ 01: Sistemas populares são maduros/antigos?")
     print(f"Idade média dos repositórios: {avg_age / 365:.2f} anos ({avg_age:.0f} dias)")
     print(f"Mediana da idade: {median_age / 365:.2f} anos ({median_age:.0f} dias)")
     print()
+    return chart
 
-def analyze_external_contributions(data):
+def analyze_external_contributions(data, stats=None, charts=True):
     """RQ 02. Sistemas populares recebem muita contribuição externa?"""
-    prs = [repo["merged_pull_requests"] for repo in data]
-    
-    plt.figure(figsize=(10, 6))
-    plt.hist(prs, bins=20, color='green', edgecolor='black')
-    plt.xlabel('Número de Pull Requests Aceitas')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Distribuição de Pull Requests Aceitas em Repositórios Populares')
-    plt.grid(axis='y', alpha=0.75)
-    plt.tight_layout()
-    plt.savefig('resultados/rq02_pull_requests.png')
-    plt.close()
+    stats = stats or compute_statistics(data)
+    chart = charts and histogram_spec(stats.histogram("merged_pull_requests"), 'resultados/rq02_pull_requests.png',
+                                      'green', 'Número de Pull Requests Aceitas',
+                                      'Distribuição de Pull Requests Aceitas em Repositórios Populares')
     
-    avg_prs = sum(prs) / len(prs)
-    median_prs = sorted(prs)[len(prs) // 2]
+    avg_prs = stats.mean("merged_pull_requests")
+    median_prs = stats.median("merged_pull_requests")
     
     print(f"RQ 02: Sistemas populares recebem muita contribuição externa?")
     print(f"Média de pull requests aceitas: {avg_prs:.0f}")
     print(f"Mediana de pull requests aceitas: {median_prs:.0f}")
+    for line in enrichment_lines(stats, "rq02"):
+        print(line)
     print()
+    return chart
 
-def analyze_releases(data):
+def analyze_releases(data, stats=None, charts=True):
     """RQ 03. Sistemas populares lançam releases com frequência?"""
-    releases = [repo["releases_count"] for repo in data]
+    stats = stats or compute_statistics(data)
+    chart = charts and histogram_spec(stats.histogram("releases_count"), 'resultados/rq03_releases.png', 'orange',
+                                      'Número de Releases', 'Distribuição do Número de Releases em Repositórios Populares')
     
-    plt.figure(figsize=(10, 6))
-    plt.hist(releases, bins=20, color='orange', edgecolor='black')
-    plt.xlabel('Número de Releases')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Distribuição do Número de Releases em Repositórios Populares')
-    plt.grid(axis='y', alpha=0.75)
-    plt.tight_layout()
-    plt.savefig('resultados/rq03_releases.png')
-    plt.close()
-    
-    avg_releases = sum(releases) / len(releases)
-    median_releases = sorted(releases)[len(releases) // 2]
+    avg_releases = stats.mean("releases_count")
+    median_releases = stats.median("releases_count")
     
     print(f"RQ 03: Sistemas populares lançam releases com frequência?")
     print(f"Média de releases: {avg_releases:.2f}")
     print(f"Mediana de releases: {median_releases:.0f}")
+    for line in enrichment_lines(stats, "rq03"):
+        print(line)
     print()
+    return chart
 
-def analyze_update_frequency(data):
+def analyze_update_frequency(data, stats=None, charts=True):
     """RQ 04. Sistemas populares são atualizados com frequência?"""
-    days_since_update = [repo["days_since_last_update"] for repo in data]
-    
-    plt.figure(figsize=(10, 6))
-    plt.hist(days_since_update, bins=20, color='red', edgecolor='black')
-    plt.xlabel('Dias desde a última atualização')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Tempo desde a Última Atualização em Repositórios Populares')
-    plt.grid(axis='y', alpha=0.75)
-    plt.tight_layout()
-    plt.savefig('resultados/rq04_last_update.png')
-    plt.close()
+    stats = stats or compute_statistics(data)
+    chart = charts and histogram_spec(stats.histogram("days_since_last_update"), 'resultados/rq04_last_update.png',
+                                      'red', 'Dias desde a última atualização',
+                                      'Tempo desde a Última Atualização em Repositórios Populares')
     
-    avg_days = sum(days_since_update) / len(days_since_update)
-    median_days = sorted(days_since_update)[len(days_since_update) // 2]
+    avg_days = stats.mean("days_since_last_update")
+    median_days = stats.median("days_since_last_update")
     
     print(f"RQ 04: Sistemas populares são atualizados com frequência?")
     print(f"Média de dias desde a última atualização: {avg_days:.2f}")
     print(f"Mediana de dias desde a última atualização: {median_days:.0f}")
     print()
+    return chart
 
-def analyze_languages(data):
+def analyze_languages(data, stats=None, charts=True):
     """RQ 05. Sistemas populares são escritos nas linguagens mais populares?"""
-    languages = [repo["language"] for repo in data]
-    language_counts = {}
-    
-    for lang in languages:
-        if lang in language_counts:
-            language_counts[lang] += 1
-        else:
-            language_counts[lang] = 1
-    
-    sorted_langs = sorted(language_counts.items(), key=lambda x: x[1], reverse=True)
-    top_languages = sorted_langs[:10]
+    stats = stats or compute_statistics(data)
+    top_languages = stats.top_languages(10)
     
     labels = [lang for lang, count in top_languages]
     counts = [count for lang, count in top_languages]
     
-    plt.figure(figsize=(12, 8))
-    plt.bar(labels, counts, color='purple')
-    plt.xlabel('Linguagem de Programação')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Top 10 Linguagens em Repositórios Populares')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig('resultados/rq05_languages.png')
-    plt.close()
+    chart = charts and bar_spec(labels, counts, 'resultados/rq05_languages.png', 'purple', 'Linguagem de Programação',
+                                'Top 10 Linguagens em Repositórios Populares')
     
     print(f"RQ 05: Sistemas populares são escritos nas linguagens mais populares?")
     print("Top 10 linguagens mais utilizadas:")
     for i, (lang, count) in enumerate(top_languages, 1):
-        print(f"{i}. {lang}: {count} repositórios ({count/len(data)*100:.1f}%)")
+        print(f"{i}. {lang}: {count} repositórios ({count/stats.count*100:.1f}%)")
     print()
+    return chart
 
-def analyze_closed_issues(data):
+def analyze_closed_issues(data, stats=None, charts=True):
     """RQ 06. Sistemas populares possuem um alto percentual de issues fechadas?"""
-    ratios = [repo["issues_closed_ratio"] for repo in data]
-    ratios_percent = [ratio * 100 for ratio in ratios]
-    
-    plt.figure(figsize=(10, 6))
-    plt.hist(ratios_percent, bins=20, color='blue', edgecolor='black')
-    plt.xlabel('Percentual de Issues Fechadas (%)')
-    plt.ylabel('Número de Repositórios')
-    plt.title('Distribuição do Percentual de Issues Fechadas em Repositórios Populares')
-    plt.grid(axis='y', alpha=0.75)
-    plt.tight_layout()
-    plt.savefig('resultados/rq06_closed_issues.png')
-    plt.close()
-    
-    avg_ratio = sum(ratios) / len(ratios)
-    median_ratio = sorted(ratios)[len(ratios) // 2]
+    stats = stats or compute_statistics(data)
+    chart = charts and histogram_spec(stats.histogram("issues_closed_ratio", scale=100),
+                                      'resultados/rq06_closed_issues.png', 'blue', 'Percentual de Issues Fechadas (%)',
+                                      'Distribuição do Percentual de Issues Fechadas em Repositórios Populares')
+    
+    avg_ratio = stats.mean("issues_closed_ratio")
+    median_ratio = stats.median("issues_closed_ratio")
     
     print(f"RQ 06: Sistemas populares possuem um alto percentual de issues fechadas?")
     print(f"Média do percentual de issues fechadas: {avg_ratio*100:.2f}%")
     print(f"Mediana do percentual de issues fechadas: {median_ratio*100:.2f}%")
     print()
+    return chart
+
+# Cor e rótulo de cada métrica nos gráficos por grupo (as mesmas cores dos histogramas das RQs)
+GROUP_CHART_STYLES = {
+    "age_days": ("skyblue", "Idade mediana (dias)"),
+    "merged_pull_requests": ("green", "Mediana de pull requests aceitas"),
+    "releases_count": ("orange", "Mediana de releases"),
+    "days_since_last_update": ("red", "Mediana de dias desde a última atualização"),
+    "issues_closed_ratio": ("blue", "Mediana do percentual de issues fechadas"),
+}
+GROUP_DIMENSION_LABELS = {
+    "language": "Linguagem de Programação",
+    "star_bucket": "Faixa de Estrelas",
+    "age_cohort": "Coorte de Idade",
+}
+
+def group_lines(partial, limit=10):
+    """Uma linha por grupo (até limit), com o tamanho e as medianas de cada métrica"""
+    summaries = partial.summaries()
+    lines = []
+    for code in partial.group_order()[:limit]:
+        count = next(iter(summaries.values()))["count"][code]
+        medians = ", ".join(f"{name}={summary['median'][code]:g}" for name, summary in summaries.items())
+        lines.append(f"{partial.labels[code]} ({count} repositórios): {medians}")
+    return lines
+
+def analyze_groups(groups, limit=10, charts=True):
+    """Métricas das RQs por linguagem, faixa de estrelas e coorte de idade; devolve os gráficos por grupo"""
+    chart_specs = []
+    for dimension, partial in groups.items():
+        print(f"Medianas por {GROUP_DIMENSION_LABELS[dimension].lower()}:")
+        for line in group_lines(partial, limit):
+            print(f"- {line}")
+        print()
+        if not charts:
+            continue
+
+        summaries = partial.summaries()
+        codes = partial.group_order()[:limit]
+        labels = [partial.labels[code] for code in codes]
+        for name, summary in summaries.items():
+            color, ylabel = GROUP_CHART_STYLES[name]
+            chart_specs.append(bar_spec(labels, summary["median"][codes], f'resultados/grupos_{dimension}_{name}.png',
+                                        color, GROUP_DIMENSION_LABELS[dimension],
+                                        f'{ylabel} por {GROUP_DIMENSION_LABELS[dimension].lower()}', ylabel=ylabel))
+    return chart_specs
+
+def correlation_lines(correlations):
+    """Uma linha por métrica com Spearman e Kendall contra stars e seus intervalos de confiança"""
+    def describe(result, method):
+        interval = result.get(f"{method}_ci")
+        text = f"{result[method]:.3f}"
+        return f"{text} (IC 95%: {interval[0]:.3f} a {interval[1]:.3f})" if interval else text
+
+    return [f"{result['metric']}: Spearman {describe(result, 'spearman')}, Kendall {describe(result, 'kendall')}"
+            for result in correlations]
 
-def save_summary(data, filename="resultados/sumario_resultados.txt"):
+def analyze_correlations(correlations):
+    """Correlações de postos entre o número de estrelas e cada métrica das RQs"""
+    print("Correlação entre estrelas e as métricas das RQs:")
+    for line in correlation_lines(correlations):
+        print(f"- {line}")
+    print()
+
+def approximate_quantile_lines(sketch_set):
+    """Linhas de texto com os quantis aproximados (KLL) e seus limites de erro"""
+    lines = []
+    for name, summary in sketch_set.summary().items():
+        values = ", ".join(f"p{int(q * 100)}≈{value:g}" for q, value in summary["quantiles"].items())
+        lines.append(f"{name} (n={summary['n']}): {values} (erro de posto ±{summary['rank_error'] * 100:.2f}%)")
+    return lines
+
+def analyze_approximate_quantiles(sketch_set):
+    """Modo aproximado: quantis globais a partir de sketches mescláveis"""
+    print("Quantis aproximados (sketches KLL):")
+    for line in approximate_quantile_lines(sketch_set):
+        print(f"- {line}")
+    print()
+
+def history_lines(history):
+    """Uma linha por snapshot do banco, com as médias das métricas das RQs"""
+    lines = []
+    for run in history:
+        means = ", ".join(f"{name}={value:.2f}" for name, value in run["means"].items())
+        lines.append(f"snapshot {run['run_id']} ({run['collected_at']}, {run['count']} repositórios): {means}")
+    return lines
+
+def analyze_history(history):
+    """Evolução das médias entre as coletas guardadas no banco SQLite"""
+    print("Evolução entre coletas (médias por snapshot):")
+    for line in history_lines(history):
+        print(f"- {line}")
+    print()
+
+def save_summary(data, filename="resultados/sumario_resultados.txt", stats=None, sketch_set=None, history=None,
+                 groups=None, correlations=None):
     """Salva um resumo dos resultados em um arquivo de texto"""
+    stats = stats or compute_statistics(data)
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     
     with open(filename, "w", encoding="utf-8") as f:
@@ -175,80 +262,191 @@ def save_summary(data, filename="resultados/sumario_resultados.txt"):
         f.write("====================================================\n\n")
         
         # RQ 01: Idade
-        ages = [repo["age_days"] for repo in data]
-        avg_age = sum(ages) / len(ages)
-        median_age = sorted(ages)[len(ages) // 2]
+        avg_age = stats.mean("age_days")
+        median_age = stats.median("age_days")
         f.write("RQ 01: Sistemas populares são maduros/antigos?\n")
         f.write(f"- Idade média dos repositórios: {avg_age / 365:.2f} anos ({avg_age:.0f} dias)\n")
         f.write(f"- Mediana da idade: {median_age / 365:.2f} anos ({median_age:.0f} dias)\n\n")
         
         # RQ 02: PRs
-        prs = [repo["merged_pull_requests"] for repo in data]
-        avg_prs = sum(prs) / len(prs)
-        median_prs = sorted(prs)[len(prs) // 2]
+        avg_prs = stats.mean("merged_pull_requests")
+        median_prs = stats.median("merged_pull_requests")
         f.write("RQ 02: Sistemas populares recebem muita contribuição externa?\n")
         f.write(f"- Média de pull requests aceitas: {avg_prs:.0f}\n")
-        f.write(f"- Mediana de pull requests aceitas: {median_prs:.0f}\n\n")
+        f.write(f"- Mediana de pull requests aceitas: {median_prs:.0f}\n")
+        for line in enrichment_lines(stats, "rq02"):
+            f.write(f"- {line}\n")
+        f.write("\n")
         
         # RQ 03: Releases
-        releases = [repo["releases_count"] for repo in data]
-        avg_releases = sum(releases) / len(releases)
-        median_releases = sorted(releases)[len(releases) // 2]
+        avg_releases = stats.mean("releases_count")
+        median_releases = stats.median("releases_count")
         f.write("RQ 03: Sistemas populares lançam releases com frequência?\n")
         f.write(f"- Média de releases: {avg_releases:.2f}\n")
-        f.write(f"- Mediana de releases: {median_releases:.0f}\n\n")
+        f.write(f"- Mediana de releases: {median_releases:.0f}\n")
+        for line in enrichment_lines(stats, "rq03"):
+            f.write(f"- {line}\n")
+        f.write("\n")
         
         # RQ 04: Atualizações
-        days_since_update = [repo["days_since_last_update"] for repo in data]
-        avg_days = sum(days_since_update) / len(days_since_update)
-        median_days = sorted(days_since_update)[len(days_since_update) // 2]
+        avg_days = stats.mean("days_since_last_update")
+        median_days = stats.median("days_since_last_update")
         f.write("RQ 04: Sistemas populares são atualizados com frequência?\n")
         f.write(f"- Média de dias desde a última atualização: {avg_days:.2f}\n")
         f.write(f"- Mediana de dias desde a última atualização: {median_days:.0f}\n\n")
         
         # RQ 05: Linguagens
-        languages = [repo["language"] for repo in data]
-        language_counts = {}
-        for lang in languages:
-            language_counts[lang] = language_counts.get(lang, 0) + 1
-        sorted_langs = sorted(language_counts.items(), key=lambda x: x[1], reverse=True)
-        top_languages = sorted_langs[:10]
-        
         f.write("RQ 05: Sistemas populares são escritos nas linguagens mais populares?\n")
-        for i, (lang, count) in enumerate(top_languages, 1):
-            f.write(f"- {i}. {lang}: {count} repositórios ({count/len(data)*100:.1f}%)\n")
+        for i, (lang, count) in enumerate(stats.top_languages(10), 1):
+            f.write(f"- {i}. {lang}: {count} repositórios ({count/stats.count*100:.1f}%)\n")
         f.write("\n")
         
         # RQ 06: Issues fechadas
-        ratios = [repo["issues_closed_ratio"] for repo in data]
-        avg_ratio = sum(ratios) / len(ratios)
-        median_ratio = sorted(ratios)[len(ratios) // 2]
+        avg_ratio = stats.mean("issues_closed_ratio")
+        median_ratio = stats.median("issues_closed_ratio")
         f.write("RQ 06: Sistemas populares possuem um alto percentual de issues fechadas?\n")
         f.write(f"- Média do percentual de issues fechadas: {avg_ratio*100:.2f}%\n")
-        f.write(f"- Mediana do percentual de issues fechadas: {median_ratio*100:.2f}%\n")
+        f.write(f"- Mediana do percentual de issues fechadas: {median_ratio*100:.2f}%\n\n")
+
+        # Percentis (mesma seleção usada para as medianas)
+        f.write("Percentis das métricas numéricas:\n")
+        for name in RQ_METRICS.values():
+            values = ", ".join(f"p{p}={stats.percentile(name, p):g}" for p in DEFAULT_PERCENTILES)
+            f.write(f"- {name}: {values}\n")
+
+        if correlations:
+            f.write("\nCorrelação entre estrelas e as métricas das RQs:\n")
+            for line in correlation_lines(correlations):
+                f.write(f"- {line}\n")
+
+        if groups:
+            for dimension, partial in groups.items():
+                f.write(f"\nMedianas por {GROUP_DIMENSION_LABELS[dimension].lower()}:\n")
+                for line in group_lines(partial):
+                    f.write(f"- {line}\n")
+
+        if sketch_set is not None:
+            f.write("\nQuantis aproximados (sketches KLL):\n")
+            for line in approximate_quantile_lines(sketch_set):
+                f.write(f"- {line}\n")
+
+        if history:
+            f.write("\nEvolução entre coletas (médias por snapshot):\n")
+            for line in history_lines(history):
+                f.write(f"- {line}\n")
     
     print(f"Resumo dos resultados salvos em {filename}")
 
-def main():
-    data = load_data()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analisa os dados coletados dos repositórios populares")
+    parser.add_argument("--data", metavar="ARQUIVO", help="arquivo de dados (padrão: o mais recente)")
+    parser.add_argument("--approximate", action="store_true",
+                        help="calcula também quantis aproximados com sketches KLL mescláveis")
+    parser.add_argument("--sketches", nargs="+", metavar="ARQUIVO",
+                        help="sketches salvos por coletas anteriores, mesclados em quantis globais")
+    parser.add_argument("--db", metavar="ARQUIVO", nargs="?", const=DATABASE_FILE,
+                        help="calcula as RQs por agregações SQL sobre um snapshot do banco (padrão: %(const)s)")
+    parser.add_argument("--snapshot", type=int, metavar="ID",
+                        help="snapshot do banco a analisar (padrão: o mais recente)")
+    parser.add_argument("--history", action="store_true",
+                        help="com --db, inclui a evolução das médias entre todos os snapshots")
+    parser.add_argument("--group-workers", type=int, default=0, metavar="N",
+                        help="divide o agrupamento por linguagem, estrelas e idade entre N processos")
+    parser.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                        help=f"reamostragens para os intervalos de confiança das correlações (ex.: {DEFAULT_RESAMPLES}; "
+                             "padrão 0 = sem intervalos)")
+    parser.add_argument("--correlation-workers", type=int, default=0, metavar="N",
+                        help="divide as reamostragens das correlações entre N processos")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="gera só o sumário em texto, sem gráficos (não carrega o matplotlib)")
+    parser.add_argument("--metrics-dir", default=METRICS_DIRECTORY,
+                        help="onde gravar o relatório da execução (analise.json) e o textfile do Prometheus (analise.prom)")
+    parser.add_argument("--profile", metavar="FASE",
+                        help="perfila uma fase com cProfile e tracemalloc (ex.: load, statistics, charts, analyze_languages)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Com run_analysis.py, coleta e análise rodam no mesmo processo e compartilham METRICS
+    METRICS.reset()
+    METRICS.profile_stage = args.profile
+    store = None
+    history = None
+    if args.db:
+        # Banco SQLite: as métricas vêm de agregações SQL, sem carregar os registros
+        store = RepositoryStore(args.db)
+        data = None
+        with METRICS.phase("statistics"):
+            stats = store.statistics(args.snapshot)
+        if stats is None:
+            print(f"Nenhum snapshot com dados em {args.db}.")
+            store.close()
+            return
+        if args.history:
+            history = store.history()
+    else:
+        with METRICS.phase("load"):
+            data = load_data(args.data)
     
-    if not data:
-        print("Não foi possível carregar os dados. Verifique se o arquivo repositories_data.json existe.")
-        return
+        if not data:
+            print("Não foi possível carregar os dados. Verifique se o arquivo repositories_data.json existe.")
+            return
     
     try:
-        analyze_repository_age(data)
-        analyze_external_contributions(data)
-        analyze_releases(data)
-        analyze_update_frequency(data)
-        analyze_languages(data)
-        analyze_closed_issues(data)
+        # Todas as métricas são calculadas uma única vez e compartilhadas
+        if store is None:
+            with METRICS.phase("statistics"):
+                stats = compute_statistics(data)
+
+        charts = []
+        for analyze in (analyze_repository_age, analyze_external_contributions, analyze_releases,
+                        analyze_update_frequency, analyze_languages, analyze_closed_issues):
+            with METRICS.phase(analyze.__name__):
+                # Com --summary-only, nenhum histograma é montado (no modo --db, nenhuma coluna sai do SQLite)
+                chart = analyze(data, stats, charts=not args.summary_only)
+                if chart:
+                    charts.append(chart)
+        # Agrupamentos e correlações precisam dos registros: não se aplicam ao modo --db
+        groups = None
+        correlations = None
+        if data is not None:
+            with METRICS.phase("correlations"):
+                correlations = correlation_statistics(data, args.bootstrap, args.correlation_workers or None)
+                analyze_correlations(correlations)
+            with METRICS.phase("groups"):
+                groups = group_statistics(data, max_workers=args.group_workers or None)
+                charts.extend(analyze_groups(groups, charts=not args.summary_only))
+                save_group_table(groups)
+        # Estágio separado: as figuras são desenhadas em paralelo e só se mudaram
+        if not args.summary_only:
+            with METRICS.phase("charts"):
+                render_charts(charts)
         
-        save_summary(data)
+        sketch_set = None
+        if args.sketches:
+            sketch_set = merge_sketch_files(args.sketches)
+        elif args.approximate:
+            sketch_set = SketchSet()
+            sketch_set.update_columns(stats.arrays)
+        if sketch_set is not None:
+            analyze_approximate_quantiles(sketch_set)
+        if history:
+            analyze_history(history)
+
+        with METRICS.phase("summary"):
+            save_summary(data, stats=stats, sketch_set=sketch_set, history=history, groups=groups,
+                         correlations=correlations)
         
-        print("Análise concluída! Os gráficos foram salvos na pasta 'resultados'.")
+        if args.summary_only:
+            print("Análise concluída! O sumário foi salvo na pasta 'resultados'.")
+        else:
+            print("Análise concluída! Os gráficos foram salvos na pasta 'resultados'.")
     except Exception as e:
         print(f"Erro durante a análise: {str(e)}")
+    finally:
+        if store is not None:
+            store.close()
+        METRICS.write("analise", args.metrics_dir)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,264 @@
+import asyncio
+import inspect
+import queue
+import threading
+import time
+
+import aiohttp
+
+import github_repos_data
+from github_repos_data import (
+    HEADERS,
+    auth_headers,
+    SEARCH_RESULT_CAP,
+    create_counts_query,
+    create_query,
+    initial_shards,
+    cached_response,
+    interpret_response,
+    merge_counts,
+    response_cost,
+    search_failed,
+    store_response,
+    shard_search_query,
+    split_failed_batch,
+    split_shard,
+)
+from metrics import METRICS
+from rate_limit import classify_error
+
+class AsyncCollector:
+    """Motor de coleta asyncio com conexões keep-alive e limite de requisições simultâneas"""
+
+    def __init__(self, max_in_flight=8, scheduler=None, max_retries=3, timeout=30, checkpoint=None):
+        self.max_in_flight = max_in_flight
+        self.scheduler = scheduler or github_repos_data.SCHEDULER
+        self.max_retries = max_retries
+        self.checkpoint = checkpoint
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+        self.semaphore = None
+        self.seen = set()
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=self.timeout)
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def post_once(self, query, attempt=0):
+        """Uma única tentativa HTTP: devolve (dados, classe de erro, token usado, latência)"""
+        token, delay = self.scheduler.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            async with self.semaphore:
+                start = time.perf_counter()
+                async with self.session.post(github_repos_data.API_ENDPOINT, json={"query": query},
+                                             headers=auth_headers(token)) as response:
+                    body = await response.read()
+                    payload = await response.json() if response.status == 200 else None
+                    status, headers = response.status, response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            latency = time.perf_counter() - start
+            METRICS.record_request("error", latency, retries=attempt)
+            print(f"Erro de conexão (tentativa {attempt + 1}/{self.max_retries}): {str(e)}")
+            return None, classify_error(None, exception=e), token, latency
+
+        latency = time.perf_counter() - start
+        METRICS.record_request(status, latency, len(body), response_cost(payload), attempt)
+        data, error_class = interpret_response(status, headers, payload, self.scheduler.scheduler(token))
+        self.scheduler.record(token, response_cost(payload), error=data is None)
+        if data is not None:
+            store_response(query, data)
+        return data, error_class, token, latency
+
+    async def wait_before_retry(self, token, error_class, attempt):
+        wait_time = self.scheduler.backoff(token, error_class, attempt)
+        print(f"Aguardando {wait_time:.1f} segundos antes de tentar novamente (tentativa {attempt + 1}/{self.max_retries})...")
+        await asyncio.sleep(wait_time)
+
+    async def post_query(self, query):
+        """Versão assíncrona de github_repos_data.post_query"""
+        found, data = cached_response(query)
+        if found:
+            return data
+        for attempt in range(self.max_retries):
+            data, error_class, token, _ = await self.post_once(query, attempt)
+            if data is not None:
+                return data
+            if attempt + 1 < self.max_retries:
+                await self.wait_before_retry(token, error_class, attempt)
+
+        print("Máximo de tentativas excedido.")
+        return None
+
+    async def fetch_search_page(self, search_query, cursor=None):
+        """Versão assíncrona de github_repos_data.fetch_search_page (tamanho de página adaptativo)"""
+        page_size = github_repos_data.PAGE_SIZE
+        split_counts = github_repos_data.SPLIT_COUNTS
+        for attempt in range(self.max_retries):
+            query = create_query(cursor, search_query, page_size.page_size, counts=not split_counts)
+            found, data = cached_response(query)
+            if found:
+                # A página fica no cache sem as contagens; as consultas por ID também estão em cache
+                if not split_counts or data is None or search_failed(data):
+                    return data
+                if await self.fill_counts(data["data"]["search"]["nodes"]):
+                    return data
+                continue
+            data, error_class, token, latency = await self.post_once(query, attempt)
+            if search_failed(data):
+                print(f"Erro na consulta GraphQL: {data.get('errors')}")
+                data, error_class = None, "server"
+            page_size.observe(latency, error_class)
+            if data is not None:
+                # Sem todas as contagens os nós seriam descartados na ingestão: a página é buscada de novo
+                if not split_counts or await self.fill_counts(data["data"]["search"]["nodes"]):
+                    return data
+            if attempt + 1 < self.max_retries:
+                await self.wait_before_retry(token, error_class, attempt)
+
+        print("Máximo de tentativas excedido.")
+        return None
+
+    async def fill_counts(self, nodes):
+        """Versão assíncrona de github_repos_data.fill_counts (lotes de cada rodada em paralelo)"""
+        ids = [node["id"] for node in nodes if node and node.get("id")]
+        batch_size = github_repos_data.COUNTS_BATCH_SIZE
+        batches = [ids[start:start + batch_size] for start in range(0, len(ids), batch_size)]
+        while batches:
+            retry = []
+            responses = await self.run_queries([create_counts_query(batch) for batch in batches])
+            for batch, data in zip(batches, responses):
+                parts = split_failed_batch(batch, merge_counts(nodes, data))
+                if parts is None:
+                    print(f"Contagens indisponíveis para o nó {batch[0]}.")
+                    return False
+                retry.extend(parts)
+            if retry:
+                print(f"Repetindo as contagens de {sum(map(len, retry))} repositórios em lotes menores...")
+            batches = retry
+        return True
+
+    async def run_queries(self, queries):
+        """Executa consultas independentes (ex.: enriquecimento) em paralelo, preservando a ordem"""
+        return await asyncio.gather(*(self.post_query(query) for query in queries))
+
+    async def fetch_shard(self, shard, on_page, total_count=None, cursor=None):
+        """Pagina o cursor de uma partição, dividindo-a se ultrapassar o limite da busca"""
+        while True:
+            if total_count and len(self.seen) >= total_count:
+                return
+            data = await self.fetch_search_page(shard_search_query(shard), cursor)
+            if data is None or "errors" in data:
+                errors = data["errors"] if data else "máximo de tentativas excedido"
+                print(f"Partição {shard_search_query(shard)} abandonada: {errors}")
+                return
+
+            search_results = data["data"]["search"]
+            if cursor is None and search_results["repositoryCount"] > SEARCH_RESULT_CAP:
+                children = split_shard(shard)
+                if children:
+                    if self.checkpoint is not None:
+                        self.checkpoint.record_split(shard_search_query(shard), children)
+                    await asyncio.gather(*(self.fetch_shard(child, on_page, total_count) for child in children))
+                    return
+                print(f"Partição {shard_search_query(shard)} não pode ser dividida; "
+                      f"apenas {SEARCH_RESULT_CAP} resultados serão coletados.")
+
+            if self.checkpoint is not None:
+                self.checkpoint.record_page(shard_search_query(shard), cursor, search_results)
+            page = []
+            for repo in search_results["nodes"]:
+                if repo and "nameWithOwner" in repo and repo["nameWithOwner"] not in self.seen:
+                    self.seen.add(repo["nameWithOwner"])
+                    page.append(repo)
+            if total_count:
+                page = page[:max(0, total_count - (len(self.seen) - len(page)))]
+            if page:
+                await deliver(on_page, page)
+            print(f"Coletados {len(self.seen)} repositórios até agora.")
+
+            page_info = search_results["pageInfo"]
+            if not page_info["hasNextPage"]:
+                return
+            cursor = page_info["endCursor"]
+
+    async def collect_pages(self, on_page, total_count=None, shards=None):
+        """Coleta todas as partições em paralelo, entregando cada página nova a on_page (função ou corrotina)"""
+        self.seen = set()
+        shards = shards or initial_shards()
+        start_points = [(shard, None) for shard in shards]
+        if self.checkpoint is not None:
+            start_points = self.checkpoint.pending_shards(shards, shard_search_query)
+            stored = list(self.checkpoint.repositories.values())[:total_count]
+            self.seen.update(self.checkpoint.repositories)
+            if stored:
+                await deliver(on_page, stored)
+        await asyncio.gather(*(self.fetch_shard(shard, on_page, total_count, cursor)
+                               for shard, cursor in start_points))
+
+    async def fetch_repositories(self, total_count=None, shards=None):
+        repositories = []
+        await self.collect_pages(repositories.extend, total_count, shards)
+        return sorted(repositories, key=lambda repo: repo["stargazerCount"], reverse=True)
+
+async def deliver(on_page, page):
+    # on_page pode ser uma corrotina (ex.: entrega a uma fila bloqueante fora do laço de eventos)
+    result = on_page(page)
+    if inspect.isawaitable(result):
+        await result
+
+def fetch_repositories_async(total_count=None, max_in_flight=8, shards=None, checkpoint=None):
+    """Ponto de entrada síncrono do motor asyncio; devolve os mesmos nós que fetch_repositories"""
+    async def run():
+        async with AsyncCollector(max_in_flight, checkpoint=checkpoint) as collector:
+            return await collector.fetch_repositories(total_count, shards)
+
+    limit = total_count if total_count else "todos os"
+    print(f"Coletando {limit} repositórios com o motor asyncio ({max_in_flight} requisições simultâneas)...")
+    return asyncio.run(run())
+
+def iter_repository_pages_async(total_count=None, max_in_flight=8, shards=None, checkpoint=None,
+                                max_buffered_pages=16):
+    """Gera as páginas do motor asyncio, que roda em uma thread própria.
+
+    A fila limitada aplica contrapressão: se o consumidor atrasar, a partição que entrega a página
+    espera em uma thread do executor, sem bloquear o laço de eventos e as demais requisições.
+    """
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    finished = object()
+    errors = []
+
+    async def hand_off(page):
+        await asyncio.get_running_loop().run_in_executor(None, pages.put, page)
+
+    async def run():
+        async with AsyncCollector(max_in_flight, checkpoint=checkpoint) as collector:
+            await collector.collect_pages(hand_off, total_count, shards)
+
+    def worker():
+        try:
+            asyncio.run(run())
+        except BaseException as e:
+            # Repassada ao consumidor: sem isso, uma falha pareceria o fim normal da coleta
+            errors.append(e)
+        finally:
+            pages.put(finished)
+
+    limit = total_count if total_count else "todos os"
+    print(f"Coletando {limit} repositórios com o motor asyncio ({max_in_flight} requisições simultâneas)...")
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    while True:
+        page = pages.get()
+        if page is finished:
+            break
+        yield page
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""Benchmarks de ponta a ponta contra o servidor falso (fake_github_server.py), sem token nem rede.
+
+Mede páginas/s, requisições/s e retries da coleta e linhas/s e pico de RSS do processamento
+e de cada analyze_*, em vários tamanhos. O resultado é gravado em JSON para acompanhar regressões.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+SIZES = [100, 10000, 1000000]
+ENGINES = ["serial", "sharded", "async"]
+
+def peak_rss_mb():
+    """Pico de memória residente do processo atual (None onde `resource` não existe)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def synthetic_nodes(count):
+    from fake_github_server import SyntheticRepositories
+
+    repositories = SyntheticRepositories(count)
+    return [repositories.node(i) for i in range(count)]
+
+def bench_fetch(count, engine, fetch_limit, workers, latency, error_rate, secondary_rate):
+    import github_repos_data
+    from fake_github_server import start_server
+    from rate_limit import TokenPool
+
+    server, url = start_server(count, latency=latency, error_rate=error_rate, secondary_rate=secondary_rate,
+                               rate_limit=10 ** 9)
+    github_repos_data.API_ENDPOINT = url
+    github_repos_data.SCHEDULER = TokenPool()
+    total = min(count, fetch_limit)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "serial":
+            repositories = github_repos_data.fetch_repositories(total)
+        elif engine == "sharded":
+            repositories = github_repos_data.fetch_repositories_sharded(total, workers)
+        else:
+            from async_collector import fetch_repositories_async
+            repositories = fetch_repositories_async(total, workers)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    stats = server.state.stats
+    retries = stats["errors_502"] + stats["errors_403"] + stats["rate_limited"]
+    return {
+        "stage": f"fetch_{engine}",
+        "repos": count,
+        "collected": len(repositories),
+        "seconds": elapsed,
+        "pages": stats["pages"],
+        "requests": stats["requests"],
+        "retries": retries,
+        "pages_per_second": stats["pages"] / elapsed if elapsed else None,
+        "requests_per_second": stats["requests"] / elapsed if elapsed else None,
+    }
+
+def bench_refresh(count, fetch_limit, workers, latency, error_rate, secondary_rate):
+    """Coleta serial seguida de --refresh do mesmo conjunto: o refresh deve custar menos requisições"""
+    import tempfile
+
+    import github_repos_data
+    from fake_github_server import start_server
+    from incremental import refresh_repositories
+    from rate_limit import TokenPool
+
+    server, url = start_server(count, latency=latency, error_rate=error_rate, secondary_rate=secondary_rate,
+                               rate_limit=10 ** 9)
+    github_repos_data.API_ENDPOINT = url
+    github_repos_data.SCHEDULER = TokenPool()
+    stats = server.state.stats
+
+    with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "repositories_data.json")
+        nodes = github_repos_data.fetch_repositories(min(count, fetch_limit))
+        github_repos_data.save_to_json(github_repos_data.process_repositories(nodes), filename)
+        collect_requests = stats["requests"]
+        start = time.perf_counter()
+        refreshed = refresh_repositories(filename, max_workers=workers)
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    requests = stats["requests"] - collect_requests
+    return {
+        "stage": "refresh",
+        "repos": count,
+        "collected": len(refreshed or []),
+        "seconds": elapsed,
+        "requests": requests,
+        "collect_requests": collect_requests,
+        "requests_per_second": requests / elapsed if elapsed else None,
+    }
+
+def stage_worker(stage, count, results):
+    """Roda um estágio em um processo limpo, para que o pico de RSS seja só dele"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import analyze_data
+    import github_repos_data
+    from stats_engine import compute_statistics
+
+    nodes = synthetic_nodes(count)
+    baseline = peak_rss_mb()
+    measurements = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        records = github_repos_data.process_repositories(nodes)
+        elapsed = time.perf_counter() - start
+        measurements.append(("process_repositories", elapsed, peak_rss_mb()))
+
+        if stage == "analyze":
+            del nodes
+            start = time.perf_counter()
+            stats = compute_statistics(records)
+            measurements.append(("compute_statistics", time.perf_counter() - start, peak_rss_mb()))
+            for function in (analyze_data.analyze_repository_age, analyze_data.analyze_external_contributions,
+                             analyze_data.analyze_releases, analyze_data.analyze_update_frequency,
+                             analyze_data.analyze_languages, analyze_data.analyze_closed_issues):
+                start = time.perf_counter()
+                function(records, stats)
+                measurements.append((function.__name__, time.perf_counter() - start, peak_rss_mb()))
+
+    results.put([
+        {
+            "stage": name,
+            "repos": count,
+            "seconds": seconds,
+            "rows_per_second": count / seconds if seconds else None,
+            "rss_before_mb": baseline,
+            "peak_rss_mb": peak,
+        }
+        for name, seconds, peak in measurements
+        if stage == "analyze" or name == "process_repositories"
+    ])
+
+def bench_stages(count):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=stage_worker, args=("analyze", count, results))
+    process.start()
+    measurements = results.get()
+    process.join()
+    return measurements
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da coleta e da análise contra um servidor falso")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="números de repositórios sintéticos")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--fetch-limit", type=int, default=10000,
+                        help="máximo de repositórios coletados por benchmark de coleta")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="latência simulada por requisição (s)")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="fração de respostas 502 injetadas")
+    parser.add_argument("--secondary-rate", type=float, default=0.0, help="fração de respostas 403 injetadas")
+    parser.add_argument("--skip-fetch", action="store_true")
+    parser.add_argument("--skip-analysis", action="store_true")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: benchmark_results/<data>.json)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.sizes:
+        if not args.skip_fetch:
+            for engine in args.engines:
+                print(f"Coleta {engine} com {count} repositórios...")
+                results.append(bench_fetch(count, engine, args.fetch_limit, args.workers, args.latency,
+                                           args.error_rate, args.secondary_rate))
+            print(f"Atualização incremental com {count} repositórios...")
+            results.append(bench_refresh(count, args.fetch_limit, args.workers, args.latency,
+                                         args.error_rate, args.secondary_rate))
+        if not args.skip_analysis:
+            print(f"Processamento e análise com {count} repositórios...")
+            results.extend(bench_stages(count))
+
+    for result in results:
+        rate = result.get("pages_per_second") or result.get("rows_per_second") or 0
+        unit = "páginas/s" if "pages_per_second" in result else "linhas/s"
+        rss = f", pico RSS {result['peak_rss_mb']:.0f} MB" if result.get("peak_rss_mb") else ""
+        if "collect_requests" in result:
+            print(f"- {result['stage']} ({result['repos']}): {result['seconds']:.3f}s, {result['requests']} "
+                  f"requisições (coleta completa: {result['collect_requests']})")
+            continue
+        print(f"- {result['stage']} ({result['repos']}): {result['seconds']:.3f}s, {rate:,.0f} {unit}{rss}")
+
+    output = args.output or os.path.join(
+        "benchmark_results", datetime.datetime.now().strftime("benchmark_%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+            "results": results,
+        }, f, indent=2)
+    print(f"Resultados salvos em {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from metrics import METRICS
+
+CHARTS_DIRECTORY = "resultados"
+MANIFEST_FILENAME = ".charts_manifest.json"
+
+def histogram_spec(histogram, filename, color, xlabel, title):
+    """Descrição de um histograma já agregado (contagens e bordas), pronta para o estágio de renderização"""
+    counts, edges = histogram
+    return {
+        "filename": filename,
+        "kind": "hist",
+        "edges": edges.tolist(),
+        "counts": counts.tolist(),
+        "style": {
+            "figsize": [10, 6],
+            "color": color,
+            "xlabel": xlabel,
+            "ylabel": "Número de Repositórios",
+            "title": title,
+        },
+    }
+
+def bar_spec(labels, counts, filename, color, xlabel, title, ylabel="Número de Repositórios"):
+    return {
+        "filename": filename,
+        "kind": "bar",
+        "labels": list(labels),
+        # Inteiros continuam inteiros (mesmo digest de antes); medianas fracionárias ficam como float
+        "counts": [int(count) if float(count).is_integer() else float(count) for count in counts],
+        "style": {
+            "figsize": [12, 8],
+            "color": color,
+            "xlabel": xlabel,
+            "ylabel": ylabel,
+            "title": title,
+        },
+    }
+
+def spec_digest(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def render_chart(spec):
+    """Desenha uma figura a partir da descrição; roda em um processo do pool, sem interface gráfica"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    style = spec["style"]
+    plt.figure(figsize=style["figsize"])
+    if spec["kind"] == "hist":
+        edges = np.asarray(spec["edges"])
+        plt.bar(edges[:-1], spec["counts"], width=np.diff(edges), align='edge',
+                color=style["color"], edgecolor='black')
+        plt.grid(axis='y', alpha=0.75)
+    else:
+        plt.bar(spec["labels"], spec["counts"], color=style["color"])
+        plt.xticks(rotation=45, ha='right')
+    plt.xlabel(style["xlabel"])
+    plt.ylabel(style["ylabel"])
+    plt.title(style["title"])
+    plt.tight_layout()
+    plt.savefig(spec["filename"])
+    plt.close()
+    return spec["filename"]
+
+def timed_render_chart(spec):
+    """render_chart que também devolve o tempo gasto (medido no processo do pool)"""
+    start = time.perf_counter()
+    filename = render_chart(spec)
+    return filename, time.perf_counter() - start
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def render_charts(specs, max_workers=None, directory=CHARTS_DIRECTORY):
+    """Renderiza em paralelo as figuras cujos dados ou estilo mudaram desde a última execução"""
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    digests = {spec["filename"]: spec_digest(spec) for spec in specs}
+    pending = [spec for spec in specs
+               if manifest.get(spec["filename"]) != digests[spec["filename"]] or not os.path.exists(spec["filename"])]
+
+    if len(pending) <= 1 or max_workers == 1:
+        timings = [timed_render_chart(spec) for spec in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            timings = list(executor.map(timed_render_chart, pending))
+    for filename, seconds in timings:
+        METRICS.record_phase(f"chart:{os.path.basename(filename)}", seconds)
+    rendered = [filename for filename, _ in timings]
+
+    manifest.update((filename, digests[filename]) for filename in rendered)
+    with open(os.path.join(directory, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    skipped = len(specs) - len(rendered)
+    print(f"Gráficos renderizados: {len(rendered)} (inalterados: {skipped}).")
+    return rendered
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import datetime
+
+def shard_to_json(shard):
+    created = shard.get("created")
+    return {
+        "stars": list(shard["stars"]),
+        "created": [created[0].isoformat(), created[1].isoformat()] if created else None,
+        "qualifiers": shard.get("qualifiers"),
+    }
+
+def shard_from_json(value):
+    created = value.get("created")
+    return {
+        "stars": tuple(value["stars"]),
+        "created": tuple(datetime.date.fromisoformat(day) for day in created) if created else None,
+        "qualifiers": value.get("qualifiers"),
+    }
+
+class CheckpointLog:
+    """Log append-only das páginas coletadas, usado para retomar uma coleta interrompida.
+
+    Cada linha é um registro JSON completo terminado em quebra de linha e gravado com
+    fsync. Uma linha truncada (processo morto no meio da escrita) é descartada ao abrir.
+    """
+
+    def __init__(self, filename="coleta_checkpoint.jsonl"):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.repositories = {}
+        self.cursors = {}
+        self.splits = {}
+        self.pages = 0
+        self._load()
+        self.file = open(filename, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            return
+
+        valid_size = 0
+        with open(self.filename, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(record)
+                # Só os nós já gravados em execuções anteriores ficam em memória, para a retomada
+                if record["type"] == "page":
+                    for repo in record["nodes"]:
+                        if repo and "nameWithOwner" in repo:
+                            self.repositories[repo["nameWithOwner"]] = repo
+                valid_size += len(line)
+
+        if valid_size != os.path.getsize(self.filename):
+            print(f"Descartando registro incompleto no final de {self.filename}.")
+            with open(self.filename, "r+b") as f:
+                f.truncate(valid_size)
+
+        if self.pages:
+            print(f"Retomando coleta: {self.pages} páginas e {len(self.repositories)} repositórios "
+                  f"já registrados em {self.filename}.")
+
+    def _apply(self, record):
+        if record["type"] == "page":
+            self.pages += 1
+            self.cursors[record["query"]] = (record["end_cursor"], record["has_next"])
+        elif record["type"] == "split":
+            self.splits[record["query"]] = [shard_from_json(child) for child in record["children"]]
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self._apply(record)
+
+    def record_page(self, search_query, cursor, search_results):
+        page_info = search_results["pageInfo"]
+        self._append({
+            "type": "page",
+            "query": search_query,
+            "cursor": cursor,
+            "end_cursor": page_info["endCursor"],
+            "has_next": page_info["hasNextPage"],
+            "nodes": search_results["nodes"],
+        })
+
+    def record_split(self, search_query, children):
+        self._append({
+            "type": "split",
+            "query": search_query,
+            "children": [shard_to_json(child) for child in children],
+        })
+
+    def resume_point(self, search_query):
+        """Devolve (cursor, concluído) da última página registrada para a consulta"""
+        if search_query not in self.cursors:
+            return None, False
+        end_cursor, has_next = self.cursors[search_query]
+        return end_cursor, not has_next
+
+    def pending_shards(self, shards, search_query_of):
+        """Expande as divisões registradas e devolve [(partição, cursor)] ainda por coletar"""
+        pending = []
+        stack = list(shards)
+        while stack:
+            shard = stack.pop()
+            key = search_query_of(shard)
+            if key in self.splits:
+                stack.extend(self.splits[key])
+                continue
+            cursor, done = self.resume_point(key)
+            if not done:
+                pending.append((shard, cursor))
+        return pending
+
+    def close(self):
+        self.file.close()
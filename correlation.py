@@ -0,0 +1,183 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from stats_engine import RQ_METRICS, to_arrays
+
+DEFAULT_RESAMPLES = 1000
+CONFIDENCE = 0.95
+# Elementos (reamostragens x linhas) processados de uma vez no bootstrap, para limitar a memória
+BOOTSTRAP_BATCH_ELEMENTS = 4000000
+# Tamanho de cada reamostragem (bootstrap m-de-n, reescalado para n); com menos linhas, o bootstrap é o usual
+RESAMPLE_SIZE = 4096
+
+class Ranking:
+    """Ordenação de uma coluna feita uma única vez e reaproveitada por todos os pares e reamostragens"""
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        self.order = np.argsort(values, kind="stable")
+        sorted_values = values[self.order]
+        new_group = np.concatenate(([True], sorted_values[1:] != sorted_values[:-1]))
+        # Início de cada grupo de empate na ordem crescente
+        self.starts = np.flatnonzero(new_group)
+        self.dense = np.empty(len(values), dtype=np.int64)
+        self.dense[self.order] = np.cumsum(new_group) - 1
+        sizes = np.diff(np.append(self.starts, len(values)))
+        # Postos médios (a partir de 1), como no Spearman com empates
+        self.average = (self.starts + (sizes + 1) / 2)[self.dense]
+
+def resample_ranks(values):
+    """Postos médios dentro de cada linha (uma reamostragem por linha), a partir de postos densos"""
+    rows, m = values.shape
+    order = np.argsort(values, axis=1)
+    ordered = np.take_along_axis(values, order, axis=1)
+    position = np.broadcast_to(np.arange(m), (rows, m))
+    new_group = np.ones((rows, m), dtype=bool)
+    new_group[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    last = np.ones((rows, m), dtype=bool)
+    last[:, :-1] = new_group[:, 1:]
+    # Primeira e última posição do grupo de empate de cada elemento (na ordem crescente)
+    first = np.maximum.accumulate(np.where(new_group, position, 0), axis=1)
+    end = np.minimum.accumulate(np.where(last, position, m)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty((rows, m))
+    np.put_along_axis(ranks, order, (first + end) / 2 + 1, axis=1)
+    return ranks
+
+def spearman(x, y):
+    """Spearman: Pearson dos postos médios já calculados"""
+    return np.corrcoef(x.average, y.average)[0, 1]
+
+def count_inversions(values):
+    """Pares i < j com values[i] > values[j] em cada linha, por mergesort de baixo para cima vetorizado"""
+    rows, m = values.shape
+    size = 1 << max(0, m - 1).bit_length()
+    # Completa cada linha até uma potência de 2 com um valor maior que todos (não cria inversões)
+    current = np.full((rows, size), int(values.max()) + 1 if values.size else 0, dtype=np.int64)
+    current[:, :m] = values
+    inversions = np.zeros(rows)
+    width = 1
+    while width < size:
+        # Cada linha de blocks é um bloco de 2 * width cujas metades já estão ordenadas
+        column = np.arange(2 * width)
+        # Em empates, a metade esquerda vem antes: só valores estritamente maiores contam
+        merged = (current.reshape(-1, 2 * width) << 1) | (column >= width)
+        # O timsort (kind="stable") intercala as duas metades já ordenadas em tempo linear
+        merged.sort(axis=1, kind="stable")
+        # O j-ésimo elemento da direita, na posição p, tem à frente p - j elementos da esquerda e
+        # width - (p - j) maiores que ele atrás; somando em j: width² + width(width - 1)/2 - soma das posições
+        positions = (merged & 1).astype(float) @ column.astype(float)
+        inversions += (width * width + width * (width - 1) // 2 - positions).reshape(rows, -1).sum(axis=1)
+        current = (merged >> 1).reshape(rows, size)
+        width *= 2
+    return inversions
+
+def tied_pairs(keys, row):
+    """Pares empatados em cada linha, dadas chaves já ordenadas dentro de cada linha"""
+    starts = np.flatnonzero(np.concatenate(([True], (keys[1:] != keys[:-1]) | (row[1:] != row[:-1]))))
+    counts = np.diff(np.append(starts, len(keys)))
+    return np.bincount(row[starts], weights=counts * (counts - 1) / 2, minlength=row[-1] + 1)
+
+def kendall_tau_b(x, y):
+    """Tau-b de Kendall de cada linha de x e y (postos densos), em O(m log² m) por linha (Knight)"""
+    rows, m = x.shape
+    span_y = int(y.max()) + 1
+    # Ordena por x e, nos empates de x, por y
+    joint = np.sort(x.astype(np.int64) * span_y + y, axis=-1)
+    x, y = joint // span_y, joint % span_y
+    row = np.repeat(np.arange(rows, dtype=np.int64), m)
+    pairs = m * (m - 1) / 2
+    x_ties = tied_pairs(x.reshape(-1), row)
+    y_ties = tied_pairs(np.sort(y, axis=-1).reshape(-1), row)
+    joint_ties = tied_pairs(joint.reshape(-1), row)
+    # Com x ordenado (e empates em x ordenados por y), os pares discordantes são as inversões de y
+    discordant = count_inversions(y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ((pairs - x_ties - y_ties + joint_ties - 2 * discordant)
+                / np.sqrt((pairs - x_ties) * (pairs - y_ties)))
+
+# Postos compartilhados com os processos do pool por herança (fork), como em ingest
+SHARED_RANKINGS = None
+
+def bootstrap_batch(seeds, size):
+    """Um lote de reamostragens (uma semente cada) com Spearman e Kendall de cada métrica, vetorizados por linha"""
+    stars, metrics = SHARED_RANKINGS
+    indexes = np.stack([np.random.default_rng(seed).integers(0, len(stars.dense), size) for seed in seeds])
+    # A média dos postos médios de uma reamostragem é sempre (size + 1) / 2
+    center = (size + 1) / 2
+    # Postos das estrelas calculados uma vez por lote e reaproveitados em todas as métricas
+    star_values = stars.dense[indexes]
+    star_ranks = resample_ranks(star_values) - center
+    star_variance = np.einsum("ij,ij->i", star_ranks, star_ranks)
+    results = {}
+    for name, ranking in metrics.items():
+        values = ranking.dense[indexes]
+        ranks = resample_ranks(values) - center
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spearman_replicates = (np.einsum("ij,ij->i", star_ranks, ranks)
+                                   / np.sqrt(star_variance * np.einsum("ij,ij->i", ranks, ranks)))
+        results[name] = (spearman_replicates, kendall_tau_b(star_values, values))
+    return results
+
+def percentile_interval(point, replicates, scale=1.0, confidence=CONFIDENCE):
+    """Intervalo percentil; com scale < 1 (m-de-n), os desvios em torno da estimativa são reescalados"""
+    replicates = replicates[~np.isnan(replicates)]
+    if len(replicates) == 0 or np.isnan(point):
+        return None
+    low, high = np.quantile(replicates, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return float(point + scale * (low - point)), float(point + scale * (high - point))
+
+def correlation_statistics(data, resamples=DEFAULT_RESAMPLES, max_workers=None, seed=42,
+                           resample_size=RESAMPLE_SIZE):
+    """Spearman e Kendall (tau-b) entre stars e cada métrica das RQs, com intervalos de confiança por bootstrap.
+
+    Cada coluna é ordenada uma única vez (Ranking); as reamostragens usam só os postos densos, em lotes
+    vetorizados que, com max_workers (onde há fork), são distribuídos entre processos. Acima de
+    resample_size linhas, cada reamostragem tem resample_size linhas (bootstrap m-de-n) e o intervalo
+    é reescalado por sqrt(m / n), o que mantém o custo independente do tamanho dos dados.
+    """
+    global SHARED_RANKINGS
+    arrays = to_arrays(data, ["stars", *RQ_METRICS.values()])
+    n = len(arrays["stars"])
+    if n < 3:
+        return []
+    stars = Ranking(arrays["stars"])
+    metrics = {name: Ranking(arrays[name]) for name in RQ_METRICS.values()}
+
+    results = []
+    for name, ranking in metrics.items():
+        results.append({
+            "metric": name,
+            "spearman": float(spearman(stars, ranking)),
+            "kendall": float(kendall_tau_b(stars.dense[None], ranking.dense[None])[0]),
+        })
+    if not resamples:
+        return results
+
+    size = min(n, resample_size)
+    batch_size = max(1, BOOTSTRAP_BATCH_ELEMENTS // size)
+    if max_workers:
+        # Lotes menores que o limite de memória quando preciso para que todos os processos recebam trabalho
+        batch_size = min(batch_size, -(-resamples // max_workers))
+    # Uma semente por reamostragem: o resultado não depende do tamanho dos lotes nem do número de processos
+    seeds = np.random.SeedSequence(seed).spawn(resamples)
+    batch_seeds = [seeds[start:start + batch_size] for start in range(0, resamples, batch_size)]
+    SHARED_RANKINGS = (stars, metrics)
+    try:
+        if max_workers and len(batch_seeds) > 1 and "fork" in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                batches = list(executor.map(bootstrap_batch, batch_seeds, repeat(size)))
+        else:
+            batches = [bootstrap_batch(batch, size) for batch in batch_seeds]
+    finally:
+        SHARED_RANKINGS = None
+
+    scale = np.sqrt(size / n)
+    for result in results:
+        name = result["metric"]
+        for index, method in enumerate(["spearman", "kendall"]):
+            replicates = np.concatenate([batch[name][index] for batch in batches])
+            result[f"{method}_ci"] = percentile_interval(result[method], replicates, scale)
+    return results
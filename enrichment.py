@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import json
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from github_repos_data import post_query
+from ingest import ENRICHMENT_FIELDS
+
+# Conexões aninhadas buscadas no enriquecimento: (campo GraphQL com placeholders, campo de data dos nós)
+ENRICHMENT_CONNECTIONS = {
+    "releases": (
+        "releases(first: {first}{after}, orderBy: {{field: CREATED_AT, direction: DESC}})",
+        "publishedAt",
+    ),
+    "mergedPullRequests": (
+        "pullRequests(states: [MERGED], first: {first}{after}, orderBy: {{field: UPDATED_AT, direction: DESC}})",
+        "mergedAt",
+    ),
+}
+MAX_BATCH_SIZE = 100
+# Custo alvo (pontos do rateLimit) por consulta em lote
+TARGET_QUERY_COST = 50
+
+def connection_fragment(connection, page_size=100, cursor=None):
+    field, date_field = ENRICHMENT_CONNECTIONS[connection]
+    after = f', after: "{cursor}"' if cursor else ""
+    alias = f"{connection}: " if not field.startswith(connection) else ""
+    return f"""{alias}{field.format(first=page_size, after=after)} {{
+          totalCount
+          pageInfo {{ hasNextPage endCursor }}
+          nodes {{ {date_field} }}
+        }}"""
+
+def repository_selector(key):
+    """Seleciona um repositório por nameWithOwner (owner/name) ou por ID de nó"""
+    if "/" in key:
+        owner, name = key.split("/", 1)
+        return f"repository(owner: {json.dumps(owner)}, name: {json.dumps(name)})"
+    return f"node(id: {json.dumps(key)})"
+
+def create_batch_query(requests_by_key, page_size=100):
+    """Uma única consulta com um alias por repositório: {chave: [(conexão, cursor)]}"""
+    parts = []
+    aliases = {}
+    for i, (key, connections) in enumerate(requests_by_key.items()):
+        alias = f"r{i}"
+        aliases[alias] = key
+        fragments = "\n        ".join(connection_fragment(connection, page_size, cursor)
+                                      for connection, cursor in connections)
+        parts.append(f"""{alias}: {repository_selector(key)} {{
+      ... on Repository {{
+        {fragments}
+      }}
+    }}""")
+    query = "{\n  rateLimit { cost limit remaining resetAt }\n  " + "\n  ".join(parts) + "\n}"
+    return query, aliases
+
+def run_queries(queries, engine="sharded", max_workers=4):
+    """Consultas independentes em paralelo (AsyncCollector no motor async, threads nos demais), na ordem recebida"""
+    if engine == "async":
+        from async_collector import AsyncCollector
+
+        async def run():
+            async with AsyncCollector(max_workers) as collector:
+                return await collector.run_queries(queries)
+        return asyncio.run(run())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(post_query, queries))
+
+def enrich_repositories(keys, connections=tuple(ENRICHMENT_CONNECTIONS), batch_size=20, max_pages=10,
+                        engine="sharded", max_in_flight=4):
+    """Busca as datas das conexões aninhadas de muitos repositórios com poucas consultas.
+
+    Os repositórios são agrupados em consultas com aliases, e até max_in_flight lotes são enviados
+    em paralelo; o tamanho do lote é reajustado a partir do custo informado pela API. Só os
+    repositórios com mais páginas são consultados novamente, e cada conexão é paginada no máximo
+    max_pages vezes.
+    """
+    results = {key: {connection: [] for connection in connections} for key in keys}
+    pages_fetched = {key: 0 for key in keys}
+    pending = {key: [(connection, None) for connection in connections] for key in keys}
+    requests_made = 0
+
+    print(f"Enriquecendo {len(keys)} repositórios ({', '.join(connections)})...")
+    while pending:
+        batches = []
+        while pending and len(batches) < max_in_flight:
+            batches.append({key: pending.pop(key) for key in list(islice(pending, batch_size))})
+        queries = [create_batch_query(batch) for batch in batches]
+        responses = run_queries([query for query, _ in queries], engine, max_in_flight)
+        requests_made += len(batches)
+        for batch, (_, aliases), data in zip(batches, queries, responses):
+            batch_size = merge_batch(batch, aliases, data, batch_size, results, pending, pages_fetched, max_pages)
+
+    print(f"Enriquecimento concluído com {requests_made} consultas.")
+    return results
+
+def merge_batch(batch, aliases, data, batch_size, results, pending, pages_fetched, max_pages):
+    """Guarda as datas de um lote e agenda as próximas páginas; devolve o novo tamanho de lote"""
+    if data is None or not data.get("data"):
+        errors = data.get("errors") if data else "máximo de tentativas excedido"
+        print(f"Erro no lote de enriquecimento ({len(batch)} repositórios): {errors}")
+        if len(batch) > 1:
+            # Divide o lote com problema pela metade e tenta de novo
+            batch_size = max(1, len(batch) // 2)
+            pending.update(batch)
+        return batch_size
+
+    cost = (data["data"].get("rateLimit") or {}).get("cost")
+    if cost:
+        batch_size = max(1, min(MAX_BATCH_SIZE, int(len(batch) * TARGET_QUERY_COST / cost)))
+
+    for alias, key in aliases.items():
+        repository = data["data"].get(alias)
+        if not repository:
+            continue
+        pages_fetched[key] += 1
+        next_pages = []
+        for connection, _ in batch[key]:
+            _, date_field = ENRICHMENT_CONNECTIONS[connection]
+            connection_data = repository[connection]
+            results[key][connection].extend(node[date_field] for node in connection_data["nodes"]
+                                            if node and node.get(date_field))
+            page_info = connection_data["pageInfo"]
+            if page_info["hasNextPage"] and pages_fetched[key] < max_pages:
+                next_pages.append((connection, page_info["endCursor"]))
+        if next_pages:
+            pending[key] = next_pages
+    return batch_size
+
+def parse_date(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def release_interval_days(dates):
+    """Mediana dos dias entre releases consecutivas (None com menos de duas releases)"""
+    if len(dates) < 2:
+        return None
+    ordered = sorted(parse_date(date) for date in dates)
+    return statistics.median((later - earlier).days for earlier, later in zip(ordered, ordered[1:]))
+
+def count_since(dates, days):
+    limit = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    return sum(1 for date in dates if parse_date(date) >= limit)
+
+def enrich_columns(names, **kwargs):
+    """Métricas de frequência de releases (RQ03) e de PRs aceitas recentes (RQ02): uma coluna por campo
+    de ENRICHMENT_FIELDS, na ordem de names"""
+    names = list(names)
+    enrichment = enrich_repositories(names, **kwargs)
+    columns = {field: [] for field in ENRICHMENT_FIELDS}
+    for name in names:
+        dates = enrichment.get(name, {})
+        releases = dates.get("releases", [])
+        merged = dates.get("mergedPullRequests", [])
+        columns["release_interval_days"].append(release_interval_days(releases))
+        columns["releases_last_year"].append(count_since(releases, 365))
+        columns["merged_pull_requests_last_year"].append(count_since(merged, 365))
+    return columns
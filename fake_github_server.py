@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+"""Servidor local que imita o endpoint GraphQL `search` do GitHub, para testes e benchmarks.
+
+Serve N repositórios sintéticos (determinísticos), com cursores, filtros stars:/created:,
+limite de 1000 resultados, latência configurável, erros 502/403 injetados e cabeçalhos de rate limit.
+Também responde a consultas `nodes(ids: [...])` com as contagens de cada repositório e a consultas
+com aliases `rN: repository(owner: ..., name: ...)`, como as do modo incremental e do enriquecimento
+(releases e pull requests aceitas com datas sintéticas, em uma única página).
+"""
+import argparse
+import datetime
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+LANGUAGES = ["Python", "JavaScript", "TypeScript", "Go", "Java", "C++", "Rust", "C", "Ruby", None]
+EPOCH = datetime.datetime(2008, 1, 1, tzinfo=datetime.timezone.utc)
+SEARCH_RESULT_CAP = 1000
+
+class SyntheticRepositories:
+    """Repositórios sintéticos gerados sob demanda a partir do índice (memória O(n) só para os filtros)"""
+
+    def __init__(self, count, seed=42):
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self.seed = seed
+        # Estrelas com cauda longa, como no GitHub
+        self.stars = (1001 + rng.pareto(1.2, count) * 800).astype(np.int64).clip(max=500000)
+        self.created_days = rng.integers(0, 6000, count)
+        order = np.argsort(-self.stars, kind="stable")
+        self.stars = self.stars[order]
+        self.created_days = self.created_days[order]
+        self.query_cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def node(self, i):
+        rng = random.Random(self.seed * 1000003 + int(i))
+        created = EPOCH + datetime.timedelta(days=int(self.created_days[i]))
+        updated = created + datetime.timedelta(days=rng.randint(0, max(0, 6000 - int(self.created_days[i]))))
+        total_issues = rng.randint(0, 5000)
+        language = LANGUAGES[rng.randrange(len(LANGUAGES))]
+        return {
+            "id": f"R_{i}",
+            "nameWithOwner": f"owner{i % 9973}/repo{i}",
+            "url": f"https://github.com/owner{i % 9973}/repo{i}",
+            "stargazerCount": int(self.stars[i]),
+            "createdAt": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updatedAt": updated.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "primaryLanguage": {"name": language} if language else None,
+            "releases": {"totalCount": rng.randint(0, 300)},
+            "pullRequests": {"totalCount": rng.randint(0, 20000)},
+            "issues": {"totalCount": total_issues},
+            "closedIssues": {"totalCount": rng.randint(0, total_issues)},
+        }
+
+    def search(self, search_query):
+        """Índices que satisfazem os qualificadores stars:/created: da busca (com cache por consulta)"""
+        with self.lock:
+            if search_query in self.query_cache:
+                self.query_cache.move_to_end(search_query)
+                return self.query_cache[search_query]
+
+        mask = np.ones(self.count, dtype=bool)
+        stars = re.search(r"stars:(\d+)\.\.(\d+)", search_query)
+        if stars:
+            mask &= (self.stars >= int(stars.group(1))) & (self.stars <= int(stars.group(2)))
+        minimum = re.search(r"stars:>(\d+)", search_query)
+        if minimum:
+            mask &= self.stars > int(minimum.group(1))
+        created = re.search(r"created:(\d{4}-\d{2}-\d{2})\.\.(\d{4}-\d{2}-\d{2})", search_query)
+        if created:
+            start, end = (datetime.datetime.fromisoformat(day).replace(tzinfo=datetime.timezone.utc)
+                          for day in created.groups())
+            mask &= (self.created_days >= (start - EPOCH).days) & (self.created_days <= (end - EPOCH).days)
+        indexes = np.flatnonzero(mask)
+
+        with self.lock:
+            self.query_cache[search_query] = indexes
+            if len(self.query_cache) > 256:
+                self.query_cache.popitem(last=False)
+        return indexes
+
+class FakeGitHubState:
+    def __init__(self, repositories, latency=0.0, error_rate=0.0, secondary_rate=0.0, rate_limit=5000,
+                 reset_seconds=3600, node_latency=0.0):
+        self.repositories = repositories
+        self.latency = latency
+        # Latência extra por nó com contagens, para simular consultas pesadas
+        self.node_latency = node_latency
+        self.error_rate = error_rate
+        self.secondary_rate = secondary_rate
+        self.rate_limit = rate_limit
+        # Orçamento separado por token (cabeçalho Authorization), como na API real
+        self.remaining = {}
+        self.reset_at = time.time() + reset_seconds
+        self.random = random.Random(7)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "pages": 0, "errors_502": 0, "errors_403": 0, "rate_limited": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+COUNT_FIELDS = ["releases", "pullRequests", "issues", "closedIssues"]
+
+def rate_limit_data(state, remaining):
+    return {"cost": 1, "limit": state.rate_limit, "remaining": remaining,
+            "resetAt": datetime.datetime.fromtimestamp(state.reset_at, datetime.timezone.utc)
+            .strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+def build_nodes_response(state, ids, remaining):
+    nodes = []
+    for node_id in ids:
+        match = re.fullmatch(r"R_(\d+)", node_id)
+        index = int(match.group(1)) if match else -1
+        if 0 <= index < state.repositories.count:
+            node = state.repositories.node(index)
+            nodes.append({"id": node["id"], **{field: node[field] for field in COUNT_FIELDS}})
+        else:
+            nodes.append(None)
+    return {"data": {"rateLimit": rate_limit_data(state, remaining), "nodes": nodes}}
+
+def connection_page(node, count, date_field, limit=100):
+    """Uma página de conexão com datas sintéticas entre a criação e a última atualização (mais recentes primeiro)"""
+    rng = random.Random(f"{node['id']}:{date_field}")
+    created = datetime.datetime.strptime(node["createdAt"], "%Y-%m-%dT%H:%M:%SZ")
+    span = max(1, int((datetime.datetime.strptime(node["updatedAt"], "%Y-%m-%dT%H:%M:%SZ") - created).total_seconds()))
+    dates = sorted((created + datetime.timedelta(seconds=rng.randrange(span)) for _ in range(min(count, limit))),
+                   reverse=True)
+    return {
+        "totalCount": count,
+        "pageInfo": {"hasNextPage": False, "endCursor": None},
+        "nodes": [{date_field: date.strftime("%Y-%m-%dT%H:%M:%SZ")} for date in dates],
+    }
+
+def build_repositories_response(state, aliases, counts, remaining, connections=()):
+    data = {"rateLimit": rate_limit_data(state, remaining)}
+    for alias, owner, name in aliases:
+        match = re.fullmatch(r"repo(\d+)", name)
+        index = int(match.group(1)) if match else -1
+        if 0 <= index < state.repositories.count and owner == f"owner{index % 9973}":
+            node = state.repositories.node(index)
+            # Os repositórios sintéticos não distinguem push de atualização
+            node["pushedAt"] = node["updatedAt"]
+            if "releases" in connections:
+                node["releases"] = connection_page(node, node["releases"]["totalCount"], "publishedAt")
+            if "mergedPullRequests" in connections:
+                node["mergedPullRequests"] = connection_page(node, node["pullRequests"]["totalCount"], "mergedAt")
+            data[alias] = node if counts else {key: value for key, value in node.items() if key not in COUNT_FIELDS}
+        else:
+            data[alias] = None
+    return {"data": data}
+
+def build_response(state, query, remaining):
+    ids = re.search(r"nodes\(ids: (\[[^\]]*\])\)", query)
+    if ids:
+        return build_nodes_response(state, json.loads(ids.group(1)), remaining)
+    aliases = re.findall(r'(\w+): repository\(owner: "([^"]*)", name: "([^"]*)"\)', query)
+    if aliases:
+        connections = [name for name, date_field in (("releases", "publishedAt"), ("mergedPullRequests", "mergedAt"))
+                       if date_field in query]
+        return build_repositories_response(state, aliases, "totalCount" in query, remaining, connections)
+    search = re.search(r'search\(query: "([^"]*)", type: REPOSITORY, first: (\d+)(?:, after: "(\d+)")?\)', query)
+    if not search:
+        return {"errors": [{"message": "Consulta não suportada pelo servidor falso."}]}
+    search_query, first, after = search.group(1), int(search.group(2)), int(search.group(3) or 0)
+    indexes = state.repositories.search(search_query)
+    visible = indexes[:SEARCH_RESULT_CAP]
+    page = visible[after:after + first]
+    end = after + len(page)
+    nodes = [state.repositories.node(i) for i in page]
+    # Sem totalCount na consulta, os nós vêm só com os campos baratos
+    if "totalCount" not in query:
+        nodes = [{key: value for key, value in node.items() if key not in COUNT_FIELDS} for node in nodes]
+    elif state.node_latency:
+        time.sleep(state.node_latency * len(nodes))
+    return {"data": {
+        "rateLimit": rate_limit_data(state, remaining),
+        "search": {
+            "repositoryCount": int(len(indexes)),
+            "pageInfo": {"hasNextPage": end < len(visible), "endCursor": str(end)},
+            "nodes": nodes,
+        },
+    }}
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.server.state
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["query"]
+        state.count("requests")
+        if state.latency:
+            time.sleep(state.latency)
+
+        token = self.headers.get("Authorization")
+        with state.lock:
+            roll = state.random.random()
+            if time.time() >= state.reset_at:
+                state.remaining.clear()
+            remaining = state.remaining.get(token, state.rate_limit)
+            exhausted = remaining <= 0
+            if not exhausted:
+                remaining -= 1
+            state.remaining[token] = remaining
+            headers = {
+                "X-RateLimit-Limit": state.rate_limit,
+                "X-RateLimit-Remaining": max(0, remaining),
+                "X-RateLimit-Reset": int(state.reset_at),
+            }
+
+        if exhausted:
+            state.count("rate_limited")
+            self.send_json(200, {"errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}, headers)
+        elif roll < state.error_rate:
+            state.count("errors_502")
+            self.send_json(502, {"message": "Bad Gateway"}, headers)
+        elif roll < state.error_rate + state.secondary_rate:
+            state.count("errors_403")
+            self.send_json(403, {"message": "You have exceeded a secondary rate limit."},
+                           dict(headers, **{"Retry-After": 1}))
+        else:
+            state.count("pages")
+            self.send_json(200, build_response(state, query, remaining), headers)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(count=10000, host="127.0.0.1", port=0, **options):
+    """Inicia o servidor em uma thread e devolve (servidor, URL do endpoint)"""
+    server = ThreadingHTTPServer((host, port), FakeGitHubHandler)
+    server.daemon_threads = True
+    server.state = FakeGitHubState(SyntheticRepositories(count), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/graphql"
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor GraphQL falso do GitHub para testes locais")
+    parser.add_argument("--repos", type=int, default=10000, help="número de repositórios sintéticos")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência por requisição, em segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 502")
+    parser.add_argument("--secondary-rate", type=float, default=0.0, help="fração de respostas 403 (limite secundário)")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="pontos por janela de rate limit")
+    parser.add_argument("--node-latency", type=float, default=0.0,
+                        help="latência extra por repositório com contagens na página, em segundos")
+    args = parser.parse_args()
+
+    server, url = start_server(args.repos, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                               secondary_rate=args.secondary_rate, rate_limit=args.rate_limit,
+                               node_latency=args.node_latency)
+    print(f"Servidor falso do GitHub em {url} com {args.repos} repositórios (Ctrl+C para encerrar).")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
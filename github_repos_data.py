@@ -4,26 +4,97 @@ import time
 import datetime
 import os
 import sys
+import textwrap
+import argparse
+from rate_limit import PageSizeController, TokenPool, classify_error, load_tokens
+from checkpoint import CheckpointLog
+from ingest import RECORD_FIELDS, ingest_nodes, records_from_columns, report_invalid, select_rows
+from records import RepositoryTable
+from metrics import METRICS, METRICS_DIRECTORY
+from response_cache import CACHE_DIRECTORY, DEFAULT_TTL, ResponseCache
+from sketches import SketchSet
+from sqlite_store import DATABASE_FILE, RepositoryStore
+from storage import COLUMNS_DIRECTORY, ColumnarWriter, open_text, save_columns, with_compression_suffix
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
-if not GITHUB_TOKEN:
-    print("Erro: Token do GitHub não encontrado!")
-    print("Defina a variável de ambiente GITHUB_TOKEN antes de executar o script.")
-    print("Exemplo no Windows: set GITHUB_TOKEN=seu_token_aqui")
-    print("Exemplo no Linux/macOS: export GITHUB_TOKEN=seu_token_aqui")
-    sys.exit(1)
+def check_token():
+    """Encerra com instruções se nenhum token estiver configurado (não é exigido no modo offline)"""
+    if SCHEDULER.tokens == [None]:
+        print("Erro: Token do GitHub não encontrado!")
+        print("Defina a variável de ambiente GITHUB_TOKEN antes de executar o script.")
+        print("Exemplo no Windows: set GITHUB_TOKEN=seu_token_aqui")
+        print("Exemplo no Linux/macOS: export GITHUB_TOKEN=seu_token_aqui")
+        print("Para vários tokens, use GITHUB_TOKENS=token1,token2 ou --tokens-file ARQUIVO.")
+        sys.exit(1)
 
 HEADERS = {
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
     "Content-Type": "application/json",
 }
-API_ENDPOINT = "https://api.github.com/graphql"
 
-def create_query(cursor=None):
+def auth_headers(token):
+    """Cabeçalhos de uma requisição feita com o token escolhido pelo pool"""
+    if token is None:
+        return HEADERS
+    return dict(HEADERS, Authorization=f"Bearer {token}")
+
+# Pode apontar para outro servidor (ex.: fake_github_server.py em testes e benchmarks)
+API_ENDPOINT = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+
+# Sessão com conexões keep-alive reaproveitadas entre as páginas (e entre threads)
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=32))
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+SEARCH_QUERY = "stars:>1000"
+# A busca do GitHub nunca devolve mais que 1000 resultados por consulta
+SEARCH_RESULT_CAP = 1000
+MAX_STARS = 1000000
+# Limites iniciais das faixas de estrelas usadas pela coleta particionada
+INITIAL_STAR_BOUNDARIES = [1001, 1500, 2000, 3000, 5000, 10000, 20000, 50000, MAX_STARS]
+FIRST_CREATED_DATE = datetime.date(2007, 10, 1)
+
+# Escalonador compartilhado por todas as requisições do processo: um orçamento por token
+SCHEDULER = TokenPool(load_tokens())
+# Cache de respostas em disco (ResponseCache), habilitado por --cache/--offline
+RESPONSE_CACHE = None
+# Tamanho de página da busca, ajustado pela latência e pelos erros do servidor
+PAGE_SIZE = PageSizeController()
+# Com --split-counts, a busca traz só os campos leves e as contagens vêm de consultas agrupadas
+SPLIT_COUNTS = False
+COUNTS_BATCH_SIZE = 100
+
+# Campos de contagem: a parte mais cara de cada nó da busca
+COUNT_FIELDS_QUERY = """
+            releases {
+              totalCount
+            }
+            pullRequests(states: [MERGED]) {
+              totalCount
+            }
+            issues(states: [OPEN, CLOSED]) {
+              totalCount
+            }
+            closedIssues: issues(states: [CLOSED]) {
+              totalCount
+            }"""
+
+def create_query(cursor=None, search_query=SEARCH_QUERY, page_size=None, counts=True):
+    """Consulta de uma página da busca; sem counts, os totalCount ficam para create_counts_query"""
     after_clause = f', after: "{cursor}"' if cursor else ""
+    page_size = page_size or PAGE_SIZE.page_size
+    # Com counts (padrão) a consulta é a mesma de sempre, o que mantém válidas as chaves do cache
+    fields = COUNT_FIELDS_QUERY if counts else """
+            id"""
     return f"""
     {{
-      search(query: "stars:>1000", type: REPOSITORY, first: 25{after_clause}) {{
+      rateLimit {{
+        cost
+        limit
+        remaining
+        resetAt
+      }}
+      search(query: "{search_query}", type: REPOSITORY, first: {page_size}{after_clause}) {{
+        repositoryCount
         pageInfo {{
           hasNextPage
           endCursor
@@ -37,139 +108,414 @@ def create_query(cursor=None):
             updatedAt
             primaryLanguage {{
               name
-            }}
-            releases {{
-              totalCount
-            }}
-            pullRequests(states: [MERGED]) {{
-              totalCount
-            }}
-            issues(states: [OPEN, CLOSED]) {{
-              totalCount
-            }}
-            closedIssues: issues(states: [CLOSED]) {{
-              totalCount
-            }}
+            }}{fields}
           }}
         }}
       }}
     }}
     """
 
-def fetch_repositories(total_count=100, max_retries=3):
-    repositories = []
+def create_counts_query(ids):
+    """Consulta leve e agrupada com só as contagens de vários repositórios, pelos IDs de nó"""
+    return f"""
+    {{
+      rateLimit {{
+        cost
+        limit
+        remaining
+        resetAt
+      }}
+      nodes(ids: {json.dumps(ids)}) {{
+        ... on Repository {{
+            id{COUNT_FIELDS_QUERY}
+        }}
+      }}
+    }}
+    """
+
+def merge_counts(nodes, data):
+    """Copia as contagens da consulta complementar para os nós da busca (por ID); devolve os IDs preenchidos"""
+    counts = {node["id"]: node for node in ((data or {}).get("data") or {}).get("nodes") or [] if node}
+    for node in nodes:
+        if node and node.get("id") in counts:
+            node.update(counts[node["id"]])
+    return counts.keys()
+
+def split_failed_batch(batch, filled):
+    """Divide em metades os IDs de um lote de contagens que ficaram sem resposta, para nova tentativa.
+
+    Devolve [] se o lote foi todo preenchido e None se um ID consultado sozinho continua falhando.
+    """
+    missing = [node_id for node_id in batch if node_id not in filled]
+    if not missing:
+        return []
+    if len(batch) == 1:
+        return None
+    half = (len(missing) + 1) // 2
+    return [part for part in (missing[:half], missing[half:]) if part]
+
+def interpret_response(status_code, headers, payload, scheduler):
+    """Atualiza o orçamento com a resposta e devolve (dados, classe de erro)"""
+    scheduler.update_from_headers(headers)
+    if status_code != 200:
+        print(f"Erro na requisição: {status_code}")
+        return None, classify_error(status_code, headers)
+
+    scheduler.update_from_rate_limit((payload.get("data") or {}).get("rateLimit"))
+    errors = payload.get("errors") or []
+    if any(error.get("type") == "RATE_LIMITED" for error in errors):
+        # Orçamento esgotado: a API responde 200 com erro RATE_LIMITED
+        print("Limite de requisições da API atingido.")
+        scheduler.block_until_reset(headers.get("X-RateLimit-Reset"))
+        return None, "exhausted"
+    return payload, None
+
+def response_cost(payload):
+    """Custo em pontos informado pela API no campo rateLimit (None se ausente)"""
+    return (((payload or {}).get("data") or {}).get("rateLimit") or {}).get("cost")
+
+def cached_response(query):
+    """Devolve (encontrado, dados) do cache; no modo offline uma falta vira (True, None)"""
+    if RESPONSE_CACHE is None:
+        return False, None
+    data = RESPONSE_CACHE.get(query)
+    if data is not None:
+        return True, data
+    if RESPONSE_CACHE.offline:
+        print("Consulta ausente do cache no modo offline.")
+        return True, None
+    return False, None
+
+def store_response(query, data):
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.put(query, data)
+
+def post_once(query, scheduler, attempt=0, max_retries=1):
+    """Uma única tentativa HTTP: devolve (dados, classe de erro, token usado, latência)"""
+    token = scheduler.acquire()
+    start = time.perf_counter()
+    try:
+        response = SESSION.post(
+            API_ENDPOINT, 
+            headers=auth_headers(token), 
+            json={"query": query},
+            timeout=30  # Adicionar timeout explícito
+        )
+        payload = response.json() if response.status_code == 200 else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        latency = time.perf_counter() - start
+        METRICS.record_request("error", latency, retries=attempt)
+        print(f"Erro de conexão (tentativa {attempt + 1}/{max_retries}): {str(e)}")
+        return None, classify_error(None, exception=e), token, latency
+
+    latency = time.perf_counter() - start
+    METRICS.record_request(response.status_code, latency, len(response.content), response_cost(payload), attempt)
+    data, error_class = interpret_response(response.status_code, response.headers, payload,
+                                           scheduler.scheduler(token))
+    scheduler.record(token, response_cost(payload), error=data is None)
+    if data is not None:
+        store_response(query, data)
+    return data, error_class, token, latency
+
+def wait_before_retry(scheduler, token, error_class, attempt, max_retries):
+    wait_time = scheduler.backoff(token, error_class, attempt)
+    print(f"Aguardando {wait_time:.1f} segundos antes de tentar novamente (tentativa {attempt + 1}/{max_retries})...")
+    time.sleep(wait_time)
+
+def post_query(query, max_retries=3, scheduler=None):
+    """Envia uma consulta GraphQL com retry e devolve o JSON da resposta (ou None)"""
+    scheduler = scheduler or SCHEDULER
+    found, data = cached_response(query)
+    if found:
+        return data
+
+    for attempt in range(max_retries):
+        data, error_class, token, _ = post_once(query, scheduler, attempt, max_retries)
+        if data is not None:
+            return data
+        if attempt + 1 < max_retries:
+            wait_before_retry(scheduler, token, error_class, attempt, max_retries)
+
+    print("Máximo de tentativas excedido.")
+    return None
+
+def search_failed(data):
+    """Resposta 200 sem a busca (ex.: timeout da consulta no GitHub): tratada como falha do servidor"""
+    return data is not None and not (data.get("data") or {}).get("search")
+
+def fetch_search_page(search_query, cursor=None, max_retries=3, scheduler=None):
+    """Busca uma página; a cada tentativa a consulta é refeita com o tamanho de página atual,
+    que PAGE_SIZE reduz após falhas e lentidão e aumenta enquanto as respostas são rápidas"""
+    scheduler = scheduler or SCHEDULER
+    for attempt in range(max_retries):
+        query = create_query(cursor, search_query, PAGE_SIZE.page_size, counts=not SPLIT_COUNTS)
+        found, data = cached_response(query)
+        if found:
+            # A página fica no cache sem as contagens; as consultas por ID também estão em cache
+            if not SPLIT_COUNTS or data is None or search_failed(data):
+                return data
+            if fill_counts(data["data"]["search"]["nodes"], max_retries, scheduler):
+                return data
+            continue
+        data, error_class, token, latency = post_once(query, scheduler, attempt, max_retries)
+        if search_failed(data):
+            print(f"Erro na consulta GraphQL: {data.get('errors')}")
+            data, error_class = None, "server"
+        PAGE_SIZE.observe(latency, error_class)
+        if data is not None:
+            # Sem todas as contagens os nós seriam descartados na ingestão: a página é buscada de novo
+            if not SPLIT_COUNTS or fill_counts(data["data"]["search"]["nodes"], max_retries, scheduler):
+                return data
+        if attempt + 1 < max_retries:
+            wait_before_retry(scheduler, token, error_class, attempt, max_retries)
+
+    print("Máximo de tentativas excedido.")
+    return None
+
+def fill_counts(nodes, max_retries=3, scheduler=None, batch_size=COUNTS_BATCH_SIZE):
+    """Completa os nós de uma busca sem contagens com consultas agrupadas por ID.
+
+    Lotes que falham são repetidos em metades até um ID por consulta; devolve False se algum nó
+    continuou sem contagens.
+    """
+    ids = [node["id"] for node in nodes if node and node.get("id")]
+    batches = [ids[start:start + batch_size] for start in range(0, len(ids), batch_size)]
+    while batches:
+        retry = []
+        for batch in batches:
+            data = post_query(create_counts_query(batch), max_retries, scheduler)
+            parts = split_failed_batch(batch, merge_counts(nodes, data))
+            if parts is None:
+                print(f"Contagens indisponíveis para o nó {batch[0]}.")
+                return False
+            retry.extend(parts)
+        if retry:
+            print(f"Repetindo as contagens de {sum(map(len, retry))} repositórios em lotes menores...")
+        batches = retry
+    return True
+
+def iter_repository_pages(total_count=100, max_retries=3, checkpoint=None):
+    """Gera as páginas (listas de nós) da busca serial à medida que chegam"""
+    collected = 0
     cursor = None
+    done = False
+
+    if checkpoint is not None:
+        stored = list(checkpoint.repositories.values())[:total_count]
+        cursor, done = checkpoint.resume_point(SEARCH_QUERY)
+        if stored:
+            collected = len(stored)
+            yield stored
     
     print(f"Coletando dados de {total_count} repositórios mais populares do GitHub...")
     
-    while len(repositories) < total_count:
-        query = create_query(cursor)
-        
-        # Implementar lógica de retry
-        retry_count = 0
-        success = False
+    while collected < total_count and not done:
+        data = fetch_search_page(SEARCH_QUERY, cursor, max_retries)
         
-        while not success and retry_count < max_retries:
-            try:
-                response = requests.post(
-                    API_ENDPOINT, 
-                    headers=HEADERS, 
-                    json={"query": query},
-                    timeout=30  # Adicionar timeout explícito
-                )
-                
-                if response.status_code == 200:
-                    success = True
-                else:
-                    retry_count += 1
-                    print(f"Erro na requisição (tentativa {retry_count}/{max_retries}): {response.status_code}")
-                    if retry_count < max_retries:
-                        wait_time = 5 * retry_count  # Backoff exponencial
-                        print(f"Aguardando {wait_time} segundos antes de tentar novamente...")
-                        time.sleep(wait_time)
-            except requests.exceptions.RequestException as e:
-                retry_count += 1
-                print(f"Erro de conexão (tentativa {retry_count}/{max_retries}): {str(e)}")
-                if retry_count < max_retries:
-                    wait_time = 5 * retry_count
-                    print(f"Aguardando {wait_time} segundos antes de tentar novamente...")
-                    time.sleep(wait_time)
-        
-        if not success:
+        if data is None:
             print("Máximo de tentativas excedido. Finalizando coleta com os dados já obtidos.")
             break
         
-        data = response.json()
-        
         if "errors" in data:
             print(f"Erro na consulta GraphQL: {data['errors']}")
             break
             
         search_results = data["data"]["search"]
-        current_repos = search_results["nodes"]
-        repositories.extend(current_repos)
+        if checkpoint is not None:
+            checkpoint.record_page(SEARCH_QUERY, cursor, search_results)
+        # Limitar ao número desejado
+        current_repos = search_results["nodes"][:total_count - collected]
+        collected += len(current_repos)
+        yield current_repos
         
-        print(f"Coletados {len(repositories)} repositórios até agora.")
+        print(f"Coletados {collected} repositórios até agora.")
         
         page_info = search_results["pageInfo"]
-        if not page_info["hasNextPage"] or len(repositories) >= total_count:
+        if not page_info["hasNextPage"]:
             break
             
         cursor = page_info["endCursor"]
-        
-        # Respeitar limites da API do GitHub
-        time.sleep(2)
-    
-    # Limitar ao número desejado
-    return repositories[:total_count]
 
-def process_repositories(repositories):
-    today = datetime.datetime.now(datetime.timezone.utc)
-    processed_data = []
-    
+def fetch_repositories(total_count=100, max_retries=3, checkpoint=None):
+    repositories = []
+    for page in iter_repository_pages(total_count, max_retries, checkpoint):
+        repositories.extend(page)
+    return repositories
+
+def shard_search_query(shard):
+    """Monta a string de busca de uma partição (faixa de estrelas e janela de criação)"""
+    low, high = shard["stars"]
+    search_query = f"stars:{low}..{high}"
+    if shard.get("created"):
+        start, end = shard["created"]
+        search_query += f" created:{start.isoformat()}..{end.isoformat()}"
+    if shard.get("qualifiers"):
+        search_query += f" {shard['qualifiers']}"
+    return search_query
+
+def split_shard(shard):
+    """Divide uma partição em duas partições disjuntas (ou devolve [] se indivisível)"""
+    low, high = shard["stars"]
+    if low < high:
+        middle = (low + high) // 2
+        return [
+            dict(shard, stars=(low, middle)),
+            dict(shard, stars=(middle + 1, high)),
+        ]
+
+    start, end = shard.get("created") or (FIRST_CREATED_DATE, datetime.date.today())
+    if start < end:
+        middle = start + (end - start) // 2
+        return [
+            dict(shard, created=(start, middle)),
+            dict(shard, created=(middle + datetime.timedelta(days=1), end)),
+        ]
+    return []
+
+def initial_shards(boundaries=INITIAL_STAR_BOUNDARIES, qualifiers=None):
+    """Partições iniciais por faixa de estrelas; qualifiers é acrescentado a todas (ex.: pushed:>...)"""
+    shards = []
+    for low, high in zip(boundaries, boundaries[1:]):
+        shards.append({
+            "stars": (low, high - 1 if high != boundaries[-1] else high),
+            "created": None,
+            "qualifiers": qualifiers,
+        })
+    return shards
+
+def fetch_shard_page(shard, cursor, scheduler, max_retries=3):
+    """Busca uma página de uma partição respeitando o orçamento compartilhado"""
+    data = fetch_search_page(shard_search_query(shard), cursor, max_retries, scheduler)
+    if data is None:
+        return None
+    if "errors" in data:
+        print(f"Erro na consulta GraphQL ({shard_search_query(shard)}): {data['errors']}")
+        return None
+    return data["data"]["search"]
+
+def iter_repository_pages_sharded(total_count=None, max_workers=4, scheduler=None, max_retries=3,
+                                   checkpoint=None, shards=None):
+    """Gera, à medida que as partições respondem, as páginas de nós ainda não vistos.
+
+    total_count apenas interrompe a coleta (ex.: em benchmarks): os primeiros nós a chegar não são
+    necessariamente os de mais estrelas.
+    """
+    scheduler = scheduler or SCHEDULER
+    # Só os nomes ficam em memória, para a deduplicação
+    seen = set()
+    pending = {}
+    shards = shards or initial_shards()
+    start_points = [(shard, None) for shard in shards]
+    if checkpoint is not None:
+        start_points = checkpoint.pending_shards(shards, shard_search_query)
+        stored = list(checkpoint.repositories.values())[:total_count]
+        seen.update(checkpoint.repositories)
+        if stored:
+            yield stored
+
+    limit = total_count if total_count else "todos os"
+    print(f"Coletando {limit} repositórios com {len(shards)} partições e {max_workers} workers...")
+
+    def submit(executor, shard, cursor=None):
+        future = executor.submit(fetch_shard_page, shard, cursor, scheduler, max_retries)
+        pending[future] = (shard, cursor)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for shard, cursor in start_points:
+            submit(executor, shard, cursor)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, cursor = pending.pop(future)
+                search_results = future.result()
+                if search_results is None:
+                    print(f"Partição {shard_search_query(shard)} abandonada após erros.")
+                    continue
+
+                # Partições acima do limite da busca são divididas e recomeçadas
+                if cursor is None and search_results["repositoryCount"] > SEARCH_RESULT_CAP:
+                    children = split_shard(shard)
+                    if children:
+                        if checkpoint is not None:
+                            checkpoint.record_split(shard_search_query(shard), children)
+                        for child in children:
+                            submit(executor, child)
+                        continue
+                    print(f"Partição {shard_search_query(shard)} não pode ser dividida; "
+                          f"apenas {SEARCH_RESULT_CAP} resultados serão coletados.")
+
+                if checkpoint is not None:
+                    checkpoint.record_page(shard_search_query(shard), cursor, search_results)
+                page = []
+                for repo in search_results["nodes"]:
+                    if repo and "nameWithOwner" in repo and repo["nameWithOwner"] not in seen:
+                        seen.add(repo["nameWithOwner"])
+                        page.append(repo)
+                if total_count:
+                    page = page[:max(0, total_count - (len(seen) - len(page)))]
+                if page:
+                    yield page
+
+                print(f"Coletados {len(seen)} repositórios até agora.")
+
+                if total_count and len(seen) >= total_count:
+                    continue
+                page_info = search_results["pageInfo"]
+                if page_info["hasNextPage"]:
+                    submit(executor, shard, page_info["endCursor"])
+
+            if total_count and len(seen) >= total_count:
+                for future in pending:
+                    future.cancel()
+                pending.clear()
+
+def fetch_repositories_sharded(total_count=None, max_workers=4, scheduler=None, max_retries=3, checkpoint=None,
+                               shards=None):
+    """Coleta particionada e paralela que ultrapassa o limite de 1000 resultados da busca"""
+    repositories = []
+    for page in iter_repository_pages_sharded(total_count, max_workers, scheduler, max_retries, checkpoint, shards):
+        repositories.extend(page)
+    return sorted(repositories, key=lambda repo: repo["stargazerCount"], reverse=True)
+
+def process_columns(repositories, max_workers=None):
+    """Processa os nós em colunas tipadas de forma vetorizada; nós inválidos são descartados pela máscara"""
     print(f"Processando dados de {len(repositories)} repositórios...")
-    
-    for repo in repositories:
-        try:
-            created_at = datetime.datetime.fromisoformat(repo["createdAt"].replace("Z", "+00:00"))
-            updated_at = datetime.datetime.fromisoformat(repo["updatedAt"].replace("Z", "+00:00"))
-            
-            # Calcula a idade do repositório em dias
-            age_days = (today - created_at).days
-            
-            # Calcula o tempo desde a última atualização em dias
-            days_since_update = (today - updated_at).days
-            
-            # Calcula o percentual de issues fechadas
-            total_issues = repo["issues"]["totalCount"]
-            closed_issues = repo["closedIssues"]["totalCount"]
-            issues_closed_ratio = closed_issues / total_issues if total_issues > 0 else 0
-            
-            processed_repo = {
-                "name": repo["nameWithOwner"],
-                "url": repo["url"],
-                "stars": repo["stargazerCount"],
-                "language": repo["primaryLanguage"]["name"] if repo["primaryLanguage"] else "None",
-                "age_days": age_days,
-                "days_since_last_update": days_since_update,
-                "releases_count": repo["releases"]["totalCount"],
-                "merged_pull_requests": repo["pullRequests"]["totalCount"],
-                "total_issues": total_issues,
-                "closed_issues": closed_issues,
-                "issues_closed_ratio": issues_closed_ratio
-            }
-            
-            processed_data.append(processed_repo)
-        except Exception as e:
-            print(f"Erro ao processar repositório {repo.get('nameWithOwner', 'desconhecido')}: {str(e)}")
-    
-    return processed_data
+    columns, valid = ingest_nodes(repositories, max_workers=max_workers)
+    report_invalid(repositories, valid)
+    return select_rows(columns, valid)
+
+def process_repositories(repositories, max_workers=None):
+    """Registros compactos (RepositoryTable); use to_dicts() para obter dicts editáveis"""
+    return RepositoryTable.from_columns(process_columns(repositories, max_workers))
+
+def iter_processed(pages):
+    """Processa cada página assim que ela chega, gerando os registros um a um"""
+    today = datetime.datetime.now(datetime.timezone.utc)
+    for page in pages:
+        columns, valid = ingest_nodes(page, today)
+        report_invalid(page, valid)
+        yield from records_from_columns(select_rows(columns, valid))
 
 def save_to_json(data, filename="repositories_data.json"):
     with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        if isinstance(data, RepositoryTable):
+            fields = data.fields
+            write_json_array(f, (dict(zip(fields, row)) for row in data.rows()))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"Dados salvos em {filename}")
 
+def write_json_array(f, items):
+    """Mesmo texto de json.dump(..., indent=2), mas item a item, sem montar a lista inteira"""
+    f.write("[")
+    empty = True
+    for item in items:
+        f.write("\n" if empty else ",\n")
+        f.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=2), "  "))
+        empty = False
+    f.write("]" if empty else "\n]")
+
 def save_to_csv(data, filename="repositories_data.csv"):
     if not data:
         print("Nenhum dado para salvar.")
@@ -178,23 +524,233 @@ def save_to_csv(data, filename="repositories_data.csv"):
     import csv
     
     with open(filename, "w", newline="", encoding="utf-8") as f:
-        headers = data[0].keys() if data else []
-        writer = csv.DictWriter(f, fieldnames=headers)
+        if isinstance(data, RepositoryTable):
+            # Campos fixos: as linhas saem direto das colunas, sem dicts intermediários
+            writer = csv.writer(f)
+            writer.writerow(data.fields)
+            writer.writerows(data.rows())
+            print(f"Dados salvos em {filename}")
+            return
+
+        # União das chaves: dados mesclados de execuções antigas podem não ter todas as colunas
+        headers = list(dict.fromkeys(key for repo in data for key in repo))
+        writer = csv.DictWriter(f, fieldnames=headers, restval="")
         
         writer.writeheader()
         writer.writerows(data)
     
     print(f"Dados salvos em {filename}")
 
-def main():
-    repositories = fetch_repositories(100)  
+def save_stream(records, jsonl_filename="repositories_data.jsonl", csv_filename="repositories_data.csv",
+                compression=None, columns_directory=COLUMNS_DIRECTORY):
+    """Grava os registros em JSONL, CSV e formato colunar à medida que são gerados, com memória constante"""
+    import csv
+
+    jsonl_filename = with_compression_suffix(jsonl_filename, compression)
+    csv_filename = with_compression_suffix(csv_filename, compression)
+    count = 0
+    columns = ColumnarWriter(columns_directory)
+    with open_text(jsonl_filename, "w") as jsonl_file, open_text(csv_filename, "w") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=RECORD_FIELDS, restval="", extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            jsonl_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            writer.writerow(record)
+            columns.append(record)
+            count += 1
+    columns.close()
+
+    print(f"Dados salvos em {jsonl_filename} e {csv_filename}")
+    return count
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta dados de repositórios populares do GitHub")
+    parser.add_argument("--total", type=int,
+                        help="número de repositórios mais populares a coletar (padrão 100); só no motor serial, "
+                             "os motores particionados coletam todos")
+    parser.add_argument("--engine", choices=["serial", "sharded", "async"], default="serial",
+                        help="serial: um cursor; sharded: partições em threads; async: partições em asyncio")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="workers da coleta particionada / requisições simultâneas no motor async")
+    parser.add_argument("--checkpoint", metavar="ARQUIVO",
+                        help="log append-only das páginas coletadas; se já existir, a coleta é retomada dele")
+    parser.add_argument("--refresh", action="store_true",
+                        help="modo incremental: busca só os repositórios alterados desde a última coleta")
+    parser.add_argument("--refresh-qualifier", choices=["pushed", "updated"], default="pushed",
+                        help="qualificador de busca usado no modo incremental")
+    parser.add_argument("--refresh-include-new", action="store_true",
+                        help="no modo incremental, acrescenta também repositórios que não estavam no conjunto de dados")
+    parser.add_argument("--stream", action="store_true",
+                        help="processa e grava cada página assim que chega (JSONL + CSV, memória constante)")
+    parser.add_argument("--compression", choices=["gzip", "zstd"],
+                        help="compressão dos arquivos gravados no modo --stream")
+    parser.add_argument("--sketches", metavar="ARQUIVO",
+                        help="atualiza sketches KLL de quantis durante a coleta e os salva neste arquivo")
+    parser.add_argument("--enrich", action="store_true",
+                        help="busca datas de releases e de PRs aceitas em consultas agrupadas (frequência de releases)")
+    parser.add_argument("--cache", metavar="DIRETORIO", nargs="?", const=CACHE_DIRECTORY,
+                        help="reaproveita respostas da API guardadas em disco (padrão: %(const)s)")
+    parser.add_argument("--cache-ttl", type=float,
+                        help="validade de todas as respostas em cache, em segundos (padrão: 6 h para buscas, "
+                             f"7 dias para repositórios e {DEFAULT_TTL // 3600} h para as demais)")
+    parser.add_argument("--cache-max-mb", type=float, default=512,
+                        help="tamanho máximo do cache; as entradas menos usadas são removidas")
+    parser.add_argument("--offline", action="store_true",
+                        help="usa apenas o cache, sem acessar a API nem exigir token")
+    parser.add_argument("--page-size", type=int, default=0, choices=range(0, 101), metavar="N",
+                        help="tamanho fixo das páginas da busca, até 100 (0 = adaptativo pela latência e pelos erros)")
+    parser.add_argument("--split-counts", action="store_true",
+                        help="busca só campos leves e obtém as contagens (PRs, issues, releases) em consultas agrupadas")
+    parser.add_argument("--tokens-file", metavar="ARQUIVO",
+                        help="arquivo com um token do GitHub por linha; as requisições são divididas entre eles")
+    parser.add_argument("--rps", type=float, default=0,
+                        help="teto opcional de requisições por segundo (0 = ditado pelo orçamento da API)")
+    parser.add_argument("--db", metavar="ARQUIVO", nargs="?", const=DATABASE_FILE,
+                        help="grava também um snapshot da coleta no banco SQLite (padrão: %(const)s)")
+    parser.add_argument("--ingest-workers", type=int, default=0,
+                        help="processos para o processamento de coletas muito grandes (0 = no processo atual)")
+    parser.add_argument("--metrics-dir", default=METRICS_DIRECTORY,
+                        help="onde gravar o relatório da execução (coleta.json) e o textfile do Prometheus (coleta.prom)")
+    parser.add_argument("--profile", metavar="FASE",
+                        choices=["fetch", "process", "enrich", "save", "sketches", "stream", "refresh"],
+                        help="perfila uma fase com cProfile e tracemalloc")
+    args = parser.parse_args(argv)
+    # As partições respondem fora de ordem: parar nos primeiros N não daria os N com mais estrelas
+    if args.engine != "serial" and args.total:
+        parser.error(f"--total não é suportado com --engine {args.engine}; use --total 0 ou o motor serial.")
+    if args.total is None:
+        args.total = 100 if args.engine == "serial" else 0
+    return args
+
+def main(argv=None):
+    global RESPONSE_CACHE, SCHEDULER, SPLIT_COUNTS
+    args = parse_args(argv)
+    # Com run_analysis.py, coleta e análise rodam no mesmo processo e compartilham METRICS
+    METRICS.reset()
+    if args.tokens_file:
+        SCHEDULER = TokenPool(load_tokens(args.tokens_file))
+    if not args.offline:
+        check_token()
+    if args.cache or args.offline:
+        # Um --cache-ttl explícito vale para todas as consultas, inclusive as buscas
+        ttl_options = {"ttl": args.cache_ttl, "ttl_overrides": {}} if args.cache_ttl is not None else {}
+        RESPONSE_CACHE = ResponseCache(args.cache or CACHE_DIRECTORY, max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                                       offline=args.offline, **ttl_options)
+    if args.rps:
+        SCHEDULER.min_interval = 1.0 / args.rps
+    if args.page_size:
+        PAGE_SIZE.fix(args.page_size)
+    elif RESPONSE_CACHE is not None:
+        # As chaves do cache incluem o tamanho da página: com cache, ele não varia
+        PAGE_SIZE.fix(PAGE_SIZE.page_size)
+    SPLIT_COUNTS = args.split_counts
+    METRICS.profile_stage = args.profile
+    try:
+        run_collection(args)
+    finally:
+        if RESPONSE_CACHE is not None:
+            RESPONSE_CACHE.report()
+        SCHEDULER.report()
+        METRICS.add_section("tokens", SCHEDULER.usage_report())
+        METRICS.add_section("final_page_size", PAGE_SIZE.page_size)
+        METRICS.write("coleta", args.metrics_dir)
+
+def run_collection(args):
+    checkpoint = CheckpointLog(args.checkpoint) if args.checkpoint else None
+    store = RepositoryStore(args.db) if args.db else None
+    try:
+        collect(args, checkpoint, store)
+    finally:
+        if store is not None:
+            store.close()
+
+def collect(args, checkpoint, store):
+    if args.refresh:
+        from incremental import refresh_repositories
+        engine = "async" if args.engine == "async" else "sharded"
+        with METRICS.phase("refresh"):
+            merged = refresh_repositories(qualifier=args.refresh_qualifier, engine=engine,
+                                          max_workers=args.workers, checkpoint=checkpoint,
+                                          include_new=args.refresh_include_new)
+        if checkpoint is not None:
+            checkpoint.close()
+        if merged:
+            with METRICS.phase("save"):
+                save_to_json(merged)
+                save_to_csv(merged)
+                save_columns(merged)
+                if store is not None:
+                    store.save_run(merged, "refresh")
+            print(f"Atualização incremental concluída! {len(merged)} repositórios no conjunto de dados.")
+        return
+
+    if args.stream:
+        if args.engine == "sharded":
+            pages = iter_repository_pages_sharded(args.total or None, args.workers, checkpoint=checkpoint)
+        elif args.engine == "async":
+            from async_collector import iter_repository_pages_async
+            pages = iter_repository_pages_async(args.total or None, args.workers, checkpoint=checkpoint)
+        else:
+            pages = iter_repository_pages(args.total, checkpoint=checkpoint)
+        records = iter_processed(pages)
+        sketch_set = SketchSet() if args.sketches else None
+        if sketch_set is not None:
+            records = sketch_set.observe(records)
+        if store is not None:
+            run_id = store.begin_run(args.engine)
+            records = store.observe(run_id, records)
+        # Coleta, processamento e gravação se intercalam: medidos como uma única fase
+        with METRICS.phase("stream"):
+            count = save_stream(records, compression=args.compression)
+        if store is not None:
+            store.finish_run(run_id)
+        if sketch_set is not None:
+            sketch_set.save(args.sketches)
+        if checkpoint is not None:
+            checkpoint.close()
+        print(f"Coleta de dados concluída com sucesso! Coletados {count} repositórios.")
+        return
+
+    with METRICS.phase("fetch"):
+        if args.engine == "sharded":
+            repositories = fetch_repositories_sharded(args.total or None, args.workers, checkpoint=checkpoint)
+        elif args.engine == "async":
+            from async_collector import fetch_repositories_async
+            repositories = fetch_repositories_async(args.total or None, args.workers, checkpoint=checkpoint)
+        else:
+            repositories = fetch_repositories(args.total, checkpoint=checkpoint)
+    if checkpoint is not None:
+        checkpoint.close()
     
     if repositories:
-        processed_data = process_repositories(repositories)
+        with METRICS.phase("process"):
+            columns = process_columns(repositories, args.ingest_workers or None)
+            processed_data = RepositoryTable.from_columns(columns)
+        if processed_data and args.enrich:
+            from enrichment import enrich_columns
+            with METRICS.phase("enrich"):
+                # As métricas do enriquecimento viram colunas da mesma tabela e dos arquivos gravados
+                columns.update(enrich_columns(columns["name"], engine=args.engine, max_in_flight=args.workers))
+                processed_data = RepositoryTable.from_columns(columns)
         
         if processed_data:
-            save_to_json(processed_data)
-            save_to_csv(processed_data)
+            with METRICS.phase("save"):
+                save_to_json(processed_data)
+                save_to_csv(processed_data)
+                # Direto das colunas tipadas, sem reler os registros
+                save_columns(columns)
+                if store is not None:
+                    store.save_run(processed_data, args.engine)
+            if args.sketches:
+                with METRICS.phase("sketches"):
+                    sketch_set = SketchSet()
+                    if isinstance(processed_data, RepositoryTable):
+                        # Os campos do array estruturado já são as colunas de cada métrica
+                        sketch_set.update_columns(processed_data.array)
+                    else:
+                        for record in processed_data:
+                            sketch_set.update(record)
+                    sketch_set.save(args.sketches)
             print(f"Coleta de dados concluída com sucesso! Coletados {len(processed_data)} repositórios.")
         else:
             print("Não foi possível processar os dados dos repositórios.")
@@ -202,4 +758,7 @@ def main():
         print("Falha na coleta de dados dos repositórios.")
 
 if __name__ == "__main__":
+    # async_collector, incremental e enrichment importam este módulo pelo nome: sem o alias, carregariam
+    # uma segunda cópia com os globais padrão e ignorariam o que main() configura (cache, tokens, página)
+    sys.modules["github_repos_data"] = sys.modules[__name__]
     main()
\ No newline at end of file
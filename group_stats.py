@@ -0,0 +1,172 @@
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from stats_engine import COLUMNAR_TYPES, DEFAULT_PERCENTILES, RQ_METRICS
+
+# Faixas de estrelas e coortes de idade (em anos): bordas inferiores de cada grupo
+STAR_BUCKETS = [(0, "<5k"), (5000, "5k-10k"), (10000, "10k-25k"), (25000, "25k-50k"),
+                (50000, "50k-100k"), (100000, "100k+")]
+AGE_COHORTS = [(0, "<2 anos"), (2, "2-5 anos"), (5, "5-10 anos"), (10, "10+ anos")]
+GROUP_DIMENSIONS = ["language", "star_bucket", "age_cohort"]
+# Acima disso, group_statistics pode dividir as linhas entre processos
+GROUP_CHUNK_SIZE = 250000
+GROUPS_FILE = "resultados/grupos.csv"
+
+def group_columns(data):
+    """Colunas usadas pelo agrupamento: linguagem (códigos + rótulos), estrelas e métricas das RQs"""
+    if isinstance(data, COLUMNAR_TYPES):
+        columns = {name: data.raw_column(name) for name in ["language", "stars", *RQ_METRICS.values()]}
+        return columns, list(data.categories("language"))
+    codes = {}
+    columns = {"language": np.fromiter((codes.setdefault(repo["language"], len(codes)) for repo in data),
+                                       dtype=np.int64, count=len(data))}
+    for name in ["stars", *RQ_METRICS.values()]:
+        columns[name] = np.fromiter((repo[name] for repo in data),
+                                    dtype=float if name == "issues_closed_ratio" else np.int64, count=len(data))
+    return columns, list(codes)
+
+def dimension_codes(columns, languages, dimension):
+    """Código do grupo de cada linha e os rótulos dos grupos de uma dimensão"""
+    if dimension == "language":
+        return np.asarray(columns["language"], dtype=np.int64), languages
+    if dimension == "star_bucket":
+        buckets, values = STAR_BUCKETS, columns["stars"]
+    else:
+        buckets, values = AGE_COHORTS, np.asarray(columns["age_days"]) / 365
+    edges = np.array([edge for edge, _ in buckets])
+    codes = np.searchsorted(edges, values, side="right") - 1
+    return codes.clip(min=0), [label for _, label in buckets]
+
+def value_counts(groups, values, weights=None):
+    """Pares (grupo, valor) distintos, ordenados, com suas contagens"""
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    weights = np.ones(len(order), dtype=np.int64) if weights is None else weights[order]
+    if len(order) == 0:
+        return groups, values, weights
+    starts = np.flatnonzero(np.concatenate(([True], (groups[1:] != groups[:-1]) | (values[1:] != values[:-1]))))
+    return groups[starts], values[starts], np.add.reduceat(weights, starts)
+
+class GroupPartial:
+    """Resultado parcial e mesclável de uma dimensão: contagens por (grupo, valor) de cada métrica.
+
+    Guardar as contagens (e não médias e medianas) permite somar blocos processados em separado
+    e ainda obter médias, medianas e percentis exatos.
+    """
+
+    def __init__(self, dimension, labels, metrics):
+        self.dimension = dimension
+        self.labels = labels
+        self.metrics = metrics
+
+    @classmethod
+    def from_columns(cls, columns, languages, dimension):
+        codes, labels = dimension_codes(columns, languages, dimension)
+        metrics = {name: value_counts(codes, np.asarray(columns[name])) for name in RQ_METRICS.values()}
+        return cls(dimension, labels, metrics)
+
+    def merge(self, other):
+        """Soma dois parciais da mesma dimensão (os rótulos podem diferir entre blocos)"""
+        labels = list(dict.fromkeys(self.labels + other.labels))
+        position = {label: i for i, label in enumerate(labels)}
+        remap = np.array([position[label] for label in other.labels], dtype=np.int64)
+        metrics = {}
+        for name, (groups, values, counts) in self.metrics.items():
+            other_groups, other_values, other_counts = other.metrics[name]
+            metrics[name] = value_counts(np.concatenate([groups, remap[other_groups]]),
+                                         np.concatenate([values, other_values]),
+                                         np.concatenate([counts, other_counts]))
+        return GroupPartial(self.dimension, labels, metrics)
+
+    def summaries(self, percentiles=DEFAULT_PERCENTILES):
+        """Por métrica: tamanho, média, mediana e percentis de cada grupo (arrays indexados pelo código)"""
+        summaries = {}
+        for name, (groups, values, counts) in self.metrics.items():
+            sizes = np.bincount(groups, weights=counts, minlength=len(self.labels)).astype(np.int64)
+            sums = np.bincount(groups, weights=values * counts, minlength=len(self.labels))
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            cumulative = np.cumsum(counts)
+
+            def at_rank(ranks):
+                # Valor de posto offset + rank na ordem (grupo, valor); grupos vazios são descartados depois
+                positions = np.searchsorted(cumulative, offsets + ranks, side="right")
+                return values[np.minimum(positions, max(len(values) - 1, 0))] if len(values) else sizes * 0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = sums / sizes
+            summaries[name] = {
+                "count": sizes,
+                "mean": means,
+                # Mesmos postos de stats_engine.order_statistics
+                "median": at_rank(sizes // 2),
+                **{f"p{p}": at_rank(np.minimum(sizes - 1, (p / 100 * sizes).astype(np.int64))) for p in percentiles},
+            }
+        return summaries
+
+    def group_order(self):
+        """Códigos dos grupos não vazios: linguagens da mais à menos frequente, faixas na ordem natural"""
+        groups, _, counts = next(iter(self.metrics.values()))
+        sizes = np.bincount(groups, weights=counts, minlength=len(self.labels))
+        codes = np.flatnonzero(sizes)
+        if self.dimension == "language":
+            codes = codes[np.argsort(-sizes[codes], kind="stable")]
+        return codes
+
+    def rows(self, percentiles=DEFAULT_PERCENTILES):
+        """Linhas da tabela de resultados: uma por (grupo, métrica)"""
+        summaries = self.summaries(percentiles)
+        return [
+            {"dimension": self.dimension, "group": self.labels[code], "metric": name,
+             **{key: values[code].item() for key, values in summary.items()}}
+            for code in self.group_order()
+            for name, summary in summaries.items()
+        ]
+
+# Colunas compartilhadas com os processos do pool por herança (fork), como em ingest
+SHARED_COLUMNS = None
+
+def partials_for_range(start, stop, languages, dimensions):
+    columns = {name: values[start:stop] for name, values in SHARED_COLUMNS.items()}
+    return [GroupPartial.from_columns(columns, languages, dimension) for dimension in dimensions]
+
+def group_statistics(data, dimensions=GROUP_DIMENSIONS, max_workers=None, chunk_size=GROUP_CHUNK_SIZE):
+    """Todas as métricas das RQs para todos os grupos de cada dimensão, em uma passada vetorizada.
+
+    Com max_workers (e onde há fork), entradas maiores que chunk_size são divididas em blocos
+    processados em paralelo e mesclados depois.
+    """
+    global SHARED_COLUMNS
+    columns, languages = group_columns(data)
+    rows = len(data)
+    if not max_workers or rows <= chunk_size or "fork" not in multiprocessing.get_all_start_methods():
+        return {dimension: GroupPartial.from_columns(columns, languages, dimension) for dimension in dimensions}
+
+    starts = list(range(0, rows, chunk_size))
+    stops = [min(start + chunk_size, rows) for start in starts]
+    SHARED_COLUMNS = columns
+    try:
+        with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            chunks = list(executor.map(partials_for_range, starts, stops, repeat(languages), repeat(dimensions)))
+    finally:
+        SHARED_COLUMNS = None
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        merged = [partial.merge(other) for partial, other in zip(merged, chunk)]
+    return dict(zip(dimensions, merged))
+
+def group_rows(groups):
+    return [row for partial in groups.values() for row in partial.rows()]
+
+def save_group_table(groups, filename=GROUPS_FILE):
+    """Tabela organizada (uma linha por dimensão, grupo e métrica) em CSV"""
+    rows = group_rows(groups)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["dimension", "group", "metric"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Métricas por grupo salvas em {filename}")
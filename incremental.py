@@ -0,0 +1,131 @@
+import datetime
+import json
+import os
+
+from enrichment import repository_selector, run_queries
+from github_repos_data import COUNT_FIELDS_QUERY, fetch_repositories_sharded, initial_shards, process_repositories
+
+# Campo de data consultado na verificação leve de cada qualificador
+TIMESTAMP_FIELDS = {"pushed": "pushedAt", "updated": "updatedAt"}
+# Os mesmos campos dos nós da busca (create_query), para coletar de novo um repositório pelo nome
+REPOSITORY_FIELDS = """nameWithOwner
+        url
+        stargazerCount
+        createdAt
+        updatedAt
+        primaryLanguage {
+          name
+        }""" + COUNT_FIELDS_QUERY
+# Repositórios por consulta: só a data na verificação, todos os campos (com contagens) na nova coleta
+PROBE_BATCH_SIZE = 100
+REFETCH_BATCH_SIZE = 25
+
+def parse_timestamp(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def load_previous_dataset(filename="repositories_data.json"):
+    """Carrega o conjunto de dados da execução anterior (ou [] se não existir)"""
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def changed_since(records, margin_days=1):
+    """Data de corte para a busca incremental: a atualização mais recente já registrada, com margem"""
+    timestamps = [parse_timestamp(repo["updated_at"]) for repo in records if repo.get("updated_at")]
+    if not timestamps:
+        return None
+    return (max(timestamps) - datetime.timedelta(days=margin_days)).date()
+
+def refresh_derived_fields(records, today=None, elapsed_days=0):
+    """Recalcula localmente age_days e days_since_last_update, sem consultar a API.
+
+    Registros antigos sem created_at/updated_at são apenas deslocados em elapsed_days.
+    """
+    today = today or datetime.datetime.now(datetime.timezone.utc)
+    for repo in records:
+        if repo.get("created_at") and repo.get("updated_at"):
+            repo["age_days"] = (today - parse_timestamp(repo["created_at"])).days
+            repo["days_since_last_update"] = (today - parse_timestamp(repo["updated_at"])).days
+        else:
+            repo["age_days"] += elapsed_days
+            repo["days_since_last_update"] += elapsed_days
+    return records
+
+def merge_records(previous, changed):
+    """Substitui os registros alterados (por nome) e acrescenta os novos, preservando a ordem anterior"""
+    merged = {repo["name"]: repo for repo in previous}
+    merged.update((repo["name"], repo) for repo in changed)
+    return list(merged.values())
+
+def create_lookup_query(names, fields):
+    """Uma consulta com um alias rN por repositório (owner/name), como em enrichment.create_batch_query"""
+    parts = [f"""r{i}: {repository_selector(name)} {{
+      ... on Repository {{
+        {fields}
+      }}
+    }}""" for i, name in enumerate(names)]
+    return "{\n  rateLimit { cost limit remaining resetAt }\n  " + "\n  ".join(parts) + "\n}"
+
+def lookup_repositories(names, fields, batch_size, engine="sharded", max_workers=4):
+    """Nós dos repositórios pelo nome, na ordem de names (None onde a consulta falhou ou não os encontrou)"""
+    batches = [names[start:start + batch_size] for start in range(0, len(names), batch_size)]
+    responses = run_queries([create_lookup_query(batch, fields) for batch in batches], engine, max_workers)
+    nodes = []
+    for batch, data in zip(batches, responses):
+        found = (data or {}).get("data") or {}
+        nodes.extend(found.get(f"r{i}") for i in range(len(batch)))
+    return nodes
+
+def changed_repositories(names, qualifier, since, engine="sharded", max_workers=4):
+    """Repositórios conhecidos com pushedAt/updatedAt posterior a since, por uma verificação leve em lotes"""
+    field = TIMESTAMP_FIELDS[qualifier]
+    probes = lookup_repositories(names, field, PROBE_BATCH_SIZE, engine, max_workers)
+    missing = sum(1 for node in probes if not node or not node.get(field))
+    if missing:
+        print(f"{missing} repositórios não puderam ser verificados e foram mantidos como estavam.")
+    return [name for name, node in zip(names, probes)
+            if node and node.get(field) and parse_timestamp(node[field]).date() > since]
+
+def search_changed(qualifier, since, engine, max_workers, checkpoint):
+    """Busca particionada por qualifier:>since em toda a população (usada com include_new)"""
+    shards = initial_shards(qualifiers=f"{qualifier}:>{since.isoformat()}")
+    if engine == "async":
+        from async_collector import fetch_repositories_async
+        return fetch_repositories_async(None, max_workers, shards=shards, checkpoint=checkpoint)
+    return fetch_repositories_sharded(None, max_workers, checkpoint=checkpoint, shards=shards)
+
+def refresh_repositories(filename="repositories_data.json", qualifier="pushed", engine="sharded",
+                         max_workers=4, checkpoint=None, include_new=False):
+    """Modo delta: busca só os repositórios alterados desde a última coleta e mescla com os dados existentes.
+
+    Os repositórios conhecidos são verificados pelo nome em consultas leves agrupadas, e só os alterados
+    são coletados de novo, de modo que o custo acompanha o tamanho do conjunto de dados. Com include_new,
+    a busca por qualifier:>data percorre toda a população e os repositórios novos também são acrescentados.
+    """
+    previous = load_previous_dataset(filename)
+    since = changed_since(previous)
+    if since is None:
+        print(f"Nenhum dado anterior com datas em {filename}; execute uma coleta completa primeiro.")
+        return None
+
+    elapsed_days = (datetime.datetime.now().timestamp() - os.path.getmtime(filename)) // 86400
+    print(f"Atualização incremental de {len(previous)} repositórios: alterações com {qualifier}:>{since.isoformat()}...")
+
+    known = {repo["name"] for repo in previous}
+    if include_new:
+        changed_nodes = search_changed(qualifier, since, engine, max_workers, checkpoint)
+    else:
+        names = changed_repositories(list(dict.fromkeys(repo["name"] for repo in previous)), qualifier, since,
+                                     engine, max_workers)
+        print(f"{len(names)} repositórios alterados; coletando-os novamente...")
+        nodes = lookup_repositories(names, REPOSITORY_FIELDS, REFETCH_BATCH_SIZE, engine, max_workers)
+        # Um repositório renomeado voltaria com outro nome: fica como estava
+        changed_nodes = [node for node in nodes if node and node.get("nameWithOwner") in known]
+    # Dicts editáveis: refresh_derived_fields recalcula campos dos registros mesclados
+    changed = process_repositories(changed_nodes).to_dicts()
+    new_count = sum(1 for repo in changed if repo["name"] not in known)
+    print(f"{len(changed) - new_count} repositórios alterados e {new_count} novos.")
+
+    merged = merge_records(previous, changed)
+    return refresh_derived_fields(merged, elapsed_days=int(elapsed_days))
@@ -0,0 +1,174 @@
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+
+METRICS_DIRECTORY = "metricas"
+PROMETHEUS_PREFIX = "lab1"
+
+class MetricsRecorder:
+    """Coleta tempos de fases e métricas por requisição e os exporta em JSON e no formato textfile do Prometheus"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.phases = []
+        self.requests = []
+        self.sections = {}
+        self.profile_stage = None
+
+    def reset(self):
+        self.__init__()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Mede uma fase; se for a fase escolhida com --profile, também a perfila"""
+        profiler = None
+        if name == self.profile_stage:
+            profiler = StageProfiler(name)
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.stop()
+            self.record_phase(name, elapsed)
+
+    def record_phase(self, name, seconds):
+        with self.lock:
+            self.phases.append({"name": name, "seconds": seconds})
+
+    def record_request(self, status, latency, response_bytes=0, cost=None, retries=0):
+        with self.lock:
+            self.requests.append({
+                "status": status,
+                "latency": latency,
+                "bytes": response_bytes,
+                "cost": cost,
+                "retries": retries,
+            })
+
+    def add_section(self, name, value):
+        """Acrescenta ao relatório JSON uma seção extra (ex.: uso por token)"""
+        with self.lock:
+            self.sections[name] = value
+
+    def request_summary(self):
+        with self.lock:
+            requests = list(self.requests)
+        latencies = sorted(request["latency"] for request in requests)
+        statuses = {}
+        for request in requests:
+            statuses[str(request["status"])] = statuses.get(str(request["status"]), 0) + 1
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else None
+
+        return {
+            "count": len(requests),
+            "statuses": statuses,
+            "retries": sum(1 for request in requests if request["retries"] > 0),
+            "latency_seconds": {
+                "total": sum(latencies),
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "max": latencies[-1] if latencies else None,
+            },
+            "response_bytes": sum(request["bytes"] for request in requests),
+            "graphql_cost": sum(request["cost"] or 0 for request in requests),
+        }
+
+    def report(self):
+        with self.lock:
+            phases = list(self.phases)
+            requests = list(self.requests)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "phases": phases,
+            "requests": self.request_summary(),
+            **self.sections,
+            "request_log": requests,
+        }
+
+    def prometheus_lines(self, run):
+        summary = self.request_summary()
+        prefix = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {prefix}_phase_seconds Duração de cada fase da execução.",
+            f"# TYPE {prefix}_phase_seconds gauge",
+        ]
+        with self.lock:
+            phases = list(self.phases)
+        for phase in phases:
+            lines.append(f'{prefix}_phase_seconds{{run="{run}",phase="{phase["name"]}"}} {phase["seconds"]:.6f}')
+        lines += [
+            f"# HELP {prefix}_requests_total Requisições HTTP à API por status.",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        for status, count in summary["statuses"].items():
+            lines.append(f'{prefix}_requests_total{{run="{run}",status="{status}"}} {count}')
+        lines += [
+            f"# TYPE {prefix}_request_latency_seconds_sum counter",
+            f'{prefix}_request_latency_seconds_sum{{run="{run}"}} {summary["latency_seconds"]["total"]:.6f}',
+            f"# TYPE {prefix}_request_retries_total counter",
+            f'{prefix}_request_retries_total{{run="{run}"}} {summary["retries"]}',
+            f"# TYPE {prefix}_response_bytes_total counter",
+            f'{prefix}_response_bytes_total{{run="{run}"}} {summary["response_bytes"]}',
+            f"# TYPE {prefix}_graphql_cost_total counter",
+            f'{prefix}_graphql_cost_total{{run="{run}"}} {summary["graphql_cost"]}',
+        ]
+        return lines
+
+    def write(self, run, directory=METRICS_DIRECTORY):
+        """Grava metricas/<run>.json (relatório completo) e metricas/<run>.prom (textfile do Prometheus)"""
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{run}.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        prometheus_path = os.path.join(directory, f"{run}.prom")
+        # Escrita atômica: o node_exporter nunca lê um arquivo pela metade
+        with open(prometheus_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.prometheus_lines(run)) + "\n")
+        os.replace(prometheus_path + ".tmp", prometheus_path)
+        print(f"Métricas da execução salvas em {json_path} e {prometheus_path}")
+
+class StageProfiler:
+    """cProfile + tracemalloc em torno de uma única fase (opcional, via --profile)"""
+
+    def __init__(self, name, directory=METRICS_DIRECTORY):
+        self.name = name
+        self.directory = directory
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        import pstats
+        import tracemalloc
+
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(self.directory, exist_ok=True)
+        profile_path = os.path.join(self.directory, f"profile_{self.name}.prof")
+        self.profile.dump_stats(profile_path)
+        print(f"Perfil da fase '{self.name}' salvo em {profile_path} "
+              f"(memória: pico {peak / 1024 / 1024:.1f} MB, atual {current / 1024 / 1024:.1f} MB)")
+        pstats.Stats(self.profile).sort_stats("cumulative").print_stats(10)
+        for stat in snapshot.statistics("lineno")[:5]:
+            print(f"  {stat}")
+
+# Registro compartilhado pelo processo
+METRICS = MetricsRecorder()
@@ -0,0 +1,288 @@
+import random
+import threading
+import time
+import datetime
+
+# Classes de erro com backoff independente: (espera base, espera máxima) em segundos
+BACKOFF_POLICIES = {
+    "server": (1.0, 30.0),        # 500/502/503/504 e timeouts do lado do GitHub
+    "network": (2.0, 60.0),       # falhas de conexão
+    "secondary": (60.0, 600.0),   # limite secundário (403/429 sem orçamento esgotado)
+    "exhausted": (1.0, 1.0),      # orçamento primário esgotado: espera até o reset
+    "other": (5.0, 60.0),
+}
+
+def parse_reset_at(value):
+    """Converte o resetAt (ISO 8601) ou X-RateLimit-Reset (epoch) em epoch"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def classify_error(status_code, headers=None, exception=None):
+    """Classifica uma falha de requisição para escolher a política de backoff"""
+    if exception is not None:
+        return "network"
+    if status_code in (500, 502, 503, 504):
+        return "server"
+    if status_code in (403, 429):
+        if headers and headers.get("X-RateLimit-Remaining") == "0":
+            return "exhausted"
+        return "secondary"
+    return "other"
+
+class RateLimitScheduler:
+    """Agenda as requisições a partir do orçamento informado pela API (rateLimit e cabeçalhos)"""
+
+    def __init__(self, max_requests_per_second=None, slowdown_fraction=0.1, reserve_points=10):
+        self.min_interval = 1.0 / max_requests_per_second if max_requests_per_second else 0.0
+        self.slowdown_fraction = slowdown_fraction
+        self.reserve_points = reserve_points
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.last_cost = 1
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def _delay(self, now):
+        wall_now = time.time()
+        delay = max(0.0, self.blocked_until - wall_now, self.next_slot - now)
+        if self.remaining is None or self.reset_at is None:
+            return delay
+
+        if self.reset_at <= wall_now:
+            # Janela renovada: o orçamento volta ao limite até a próxima resposta
+            self.remaining = self.limit
+            self.reset_at = None
+            return delay
+
+        seconds_to_reset = self.reset_at - wall_now
+        if self.remaining <= self.reserve_points + self.last_cost:
+            # Orçamento esgotado: dormir até o reset
+            return max(delay, seconds_to_reset + 1)
+
+        if self.limit and self.remaining < self.limit * self.slowdown_fraction:
+            # Perto do limite: espalhar o restante do orçamento até o reset
+            requests_left = max(1, (self.remaining - self.reserve_points) // max(1, self.last_cost))
+            delay = max(delay, seconds_to_reset / requests_left)
+        return delay
+
+    def reserve(self):
+        """Reserva a próxima requisição e devolve quantos segundos esperar antes de enviá-la"""
+        with self.lock:
+            now = time.monotonic()
+            delay = self._delay(now)
+            self.next_slot = now + delay + self.min_interval
+            if self.remaining is not None:
+                # Reserva o custo estimado para que as outras threads vejam o orçamento atualizado
+                self.remaining -= self.last_cost
+        if delay >= 5:
+            print(f"Aguardando {delay:.0f} segundos pelo orçamento da API...")
+        return delay
+
+    def acquire(self):
+        """Bloqueia até que a próxima requisição possa ser enviada"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        with self.lock:
+            if headers.get("X-RateLimit-Limit"):
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if headers.get("X-RateLimit-Remaining"):
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = parse_reset_at(headers.get("X-RateLimit-Reset"))
+            if reset_at:
+                self.reset_at = reset_at
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                try:
+                    self.blocked_until = max(self.blocked_until, time.time() + float(retry_after))
+                except ValueError:
+                    pass
+
+    def update_from_rate_limit(self, rate_limit):
+        """Atualiza o orçamento com o objeto rateLimit { cost remaining resetAt } da consulta"""
+        if not rate_limit:
+            return
+        with self.lock:
+            if rate_limit.get("cost") is not None:
+                self.last_cost = max(1, int(rate_limit["cost"]))
+            if rate_limit.get("limit") is not None:
+                self.limit = int(rate_limit["limit"])
+            if rate_limit.get("remaining") is not None:
+                self.remaining = int(rate_limit["remaining"])
+            reset_at = parse_reset_at(rate_limit.get("resetAt"))
+            if reset_at:
+                self.reset_at = reset_at
+
+    def block_until_reset(self, reset_at=None):
+        """Usado quando a API responde que o orçamento acabou (RATE_LIMITED)"""
+        with self.lock:
+            self.reset_at = parse_reset_at(reset_at) or self.reset_at
+            if self.reset_at:
+                self.blocked_until = max(self.blocked_until, self.reset_at + 1)
+            self.remaining = 0
+
+    def backoff(self, error_class, attempt):
+        """Espera exponencial com jitter completo, separada por classe de erro"""
+        base, cap = BACKOFF_POLICIES.get(error_class, BACKOFF_POLICIES["other"])
+        if error_class == "secondary":
+            # O GitHub pede ao menos um minuto após um limite secundário: a base é o piso, e o jitter vem por cima
+            wait_time = base + random.uniform(0, max(0.0, min(cap, base * (2 ** attempt)) - base))
+        else:
+            wait_time = random.uniform(0, min(cap, base * (2 ** attempt)))
+        with self.lock:
+            blocked_for = self.blocked_until - time.time()
+        if error_class == "secondary" and blocked_for > 0:
+            # O servidor informou quanto esperar (Retry-After): isso vale mais que a estimativa
+            return blocked_for
+        return max(wait_time, blocked_for)
+
+# Orçamento presumido de um token antes da primeira resposta da API
+DEFAULT_TOKEN_BUDGET = 5000
+
+def load_tokens(filename=None):
+    """Tokens do arquivo (um por linha, # comenta), de GITHUB_TOKENS (separados por vírgula/espaço) ou de GITHUB_TOKEN"""
+    import os
+
+    filename = filename or os.environ.get("GITHUB_TOKENS_FILE")
+    tokens = []
+    if filename:
+        with open(filename, "r", encoding="utf-8") as f:
+            tokens = [line.split("#", 1)[0].strip() for line in f]
+    elif os.environ.get("GITHUB_TOKENS"):
+        tokens = os.environ["GITHUB_TOKENS"].replace(",", " ").split()
+    elif os.environ.get("GITHUB_TOKEN"):
+        tokens = [os.environ["GITHUB_TOKEN"]]
+    # Remove vazios e repetidos, preservando a ordem
+    return list(dict.fromkeys(token for token in tokens if token))
+
+def mask_token(token):
+    return f"…{token[-4:]}" if token else "anônimo"
+
+class TokenPool:
+    """Distribui as requisições entre vários tokens, cada um com seu próprio RateLimitScheduler.
+
+    Cada requisição vai para o token com mais orçamento restante (empates: o menos usado);
+    tokens esgotados ficam de fora até o reset. Sem tokens, usa um único "token" anônimo (None).
+    """
+
+    def __init__(self, tokens=None, max_requests_per_second=None, **scheduler_options):
+        self.tokens = list(tokens or []) or [None]
+        self.schedulers = {token: RateLimitScheduler(**scheduler_options) for token in self.tokens}
+        self.usage = {token: {"requests": 0, "cost": 0, "errors": 0} for token in self.tokens}
+        # Teto global opcional de requisições por segundo (somando todos os tokens)
+        self.min_interval = 1.0 / max_requests_per_second if max_requests_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def budget(self, token, now):
+        """(disponível agora, orçamento estimado, instante em que volta a ficar disponível)"""
+        scheduler = self.schedulers[token]
+        with scheduler.lock:
+            remaining, limit, reset_at = scheduler.remaining, scheduler.limit, scheduler.reset_at
+            blocked_until, reserve = scheduler.blocked_until, scheduler.reserve_points + scheduler.last_cost
+        if remaining is None or (reset_at is not None and reset_at <= now):
+            remaining = limit or DEFAULT_TOKEN_BUDGET
+        exhausted = remaining <= reserve and reset_at is not None and reset_at > now
+        available_at = max(blocked_until, reset_at if exhausted else 0.0)
+        return available_at <= now, remaining, available_at
+
+    def select(self):
+        now = time.time()
+        budgets = {token: self.budget(token, now) for token in self.tokens}
+        available = [token for token in self.tokens if budgets[token][0]]
+        if not available:
+            # Todos esgotados: o que voltar primeiro (o próprio scheduler espera até lá)
+            return min(self.tokens, key=lambda token: budgets[token][2])
+        return max(available, key=lambda token: (budgets[token][1], -self.usage[token]["requests"]))
+
+    def reserve(self):
+        """Escolhe o token da próxima requisição e devolve (token, segundos a esperar)"""
+        with self.lock:
+            token = self.select()
+            self.usage[token]["requests"] += 1
+        delay = self.schedulers[token].reserve()
+        with self.lock:
+            now = time.monotonic()
+            delay = max(delay, self.next_slot - now)
+            self.next_slot = now + delay + self.min_interval
+        return token, delay
+
+    def acquire(self):
+        """Bloqueia até que a próxima requisição possa ser enviada e devolve o token a usar"""
+        token, delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return token
+
+    def scheduler(self, token):
+        return self.schedulers[token]
+
+    def record(self, token, cost=None, error=False):
+        with self.lock:
+            self.usage[token]["cost"] += cost or 0
+            self.usage[token]["errors"] += 1 if error else 0
+
+    def backoff(self, token, error_class, attempt):
+        """Como RateLimitScheduler.backoff, mas sem esperar se outro token ainda tem orçamento"""
+        if error_class == "exhausted":
+            now = time.time()
+            if any(self.budget(other, now)[0] for other in self.tokens if other != token):
+                return 0.0
+        return self.schedulers[token].backoff(error_class, attempt)
+
+    def usage_report(self):
+        report = {}
+        for token in self.tokens:
+            scheduler = self.schedulers[token]
+            report[mask_token(token)] = dict(self.usage[token], remaining=scheduler.remaining,
+                                             reset_at=scheduler.reset_at)
+        return report
+
+    def report(self):
+        print(f"Uso dos tokens ({len(self.tokens)}):")
+        for token, usage in self.usage_report().items():
+            remaining = usage["remaining"] if usage["remaining"] is not None else "?"
+            print(f"- {token}: {usage['requests']} requisições, {usage['cost']} pontos, "
+                  f"{usage['errors']} erros, {remaining} pontos restantes")
+
+class PageSizeController:
+    """Tamanho de página adaptativo (aumento aditivo, redução multiplicativa).
+
+    Cresce enquanto as páginas voltam rápido e cai pela metade quando a latência passa do alvo
+    ou o servidor falha (502/504, timeouts), evitando as consultas pesadas que o GitHub derruba.
+    """
+
+    def __init__(self, initial=25, minimum=5, maximum=100, target_latency=4.0, step=10):
+        self.page_size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.step = step
+        self.lock = threading.Lock()
+
+    def fix(self, page_size):
+        """Desliga a adaptação (ex.: --page-size ou cache offline, cujas chaves dependem do tamanho)"""
+        with self.lock:
+            self.page_size = self.minimum = self.maximum = page_size
+
+    def observe(self, latency, error_class=None):
+        with self.lock:
+            if error_class in ("server", "network") or latency > self.target_latency:
+                self.page_size = max(self.minimum, self.page_size // 2)
+            elif error_class is None and latency < self.target_latency / 2:
+                self.page_size = min(self.maximum, self.page_size + self.step)
+            return self.page_size
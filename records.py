@@ -0,0 +1,162 @@
+import numpy as np
+
+from ingest import ENRICHMENT_FIELDS, RECORD_FIELDS, parse_timestamps
+
+# Uma linha por repositório: textos longos como referências, datas como datetime64 e
+# a linguagem como código inteiro em uma tabela de categorias compartilhada
+RECORD_DTYPE = np.dtype([
+    ("name", object),
+    ("url", object),
+    ("created_at", "datetime64[s]"),
+    ("updated_at", "datetime64[s]"),
+    ("stars", np.int32),
+    ("language", np.uint16),
+    ("age_days", np.int32),
+    ("days_since_last_update", np.int32),
+    ("releases_count", np.int32),
+    ("merged_pull_requests", np.int32),
+    ("total_issues", np.int32),
+    ("closed_issues", np.int32),
+    ("issues_closed_ratio", np.float64),
+])
+# Campos de --enrich, acrescentados ao dtype quando presentes (intervalo ausente = NaN)
+ENRICHMENT_DTYPE = [
+    ("release_interval_days", np.float64),
+    ("releases_last_year", np.int32),
+    ("merged_pull_requests_last_year", np.int32),
+]
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+def format_timestamps(values):
+    """datetime64[s] de volta ao texto da API ("2020-01-31T12:00:00Z")"""
+    return [f"{value}Z" for value in np.datetime_as_string(values, unit="s")]
+
+class RepositoryRecord:
+    """Um repositório processado, com acesso por atributo ou por chave (como os dicts de antes)"""
+
+    __slots__ = tuple(RECORD_FIELDS + ENRICHMENT_FIELDS)
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def keys(self):
+        return RECORD_FIELDS + ENRICHMENT_FIELDS if hasattr(self, ENRICHMENT_FIELDS[0]) else RECORD_FIELDS
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"RepositoryRecord({self.name!r}, stars={self.stars})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.keys()}
+
+class RepositoryTable:
+    """Repositórios processados em um array estruturado do NumPy.
+
+    Mesma interface de leitura de storage.ColumnarDataset (raw_column, column, categories), de modo
+    que a análise usa os arrays diretamente; a iteração gera RepositoryRecord sob demanda.
+    """
+
+    def __init__(self, array, languages):
+        self.array = array
+        self.languages = languages
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Monta a tabela a partir das colunas de ingest.ingest_nodes (já filtradas por select_rows),
+        com as de --enrich quando todas estão presentes"""
+        rows = len(columns["name"])
+        enriched = all(name in columns for name in ENRICHMENT_FIELDS)
+        array = np.empty(rows, dtype=np.dtype(RECORD_DTYPE.descr + ENRICHMENT_DTYPE) if enriched else RECORD_DTYPE)
+        codes = {}
+        for name in array.dtype.names:
+            values = columns[name]
+            if name == "release_interval_days":
+                values = np.asarray(values, dtype=np.float64)
+            elif name == "language":
+                # Códigos na ordem de primeira aparição, como no formato colunar
+                values = [codes.setdefault(value, len(codes)) for value in values]
+            elif name in TIMESTAMP_FIELDS:
+                values = parse_timestamps(values)
+            array[name] = values
+        return cls(array, list(codes))
+
+    @classmethod
+    def from_records(cls, records):
+        """Converte registros em dicts (ex.: lidos de repositories_data.json)"""
+        records = list(records)
+        fields = RECORD_FIELDS
+        if records and all(name in records[0] for name in ENRICHMENT_FIELDS):
+            fields = RECORD_FIELDS + ENRICHMENT_FIELDS
+        return cls.from_columns({name: [record[name] for record in records] for name in fields})
+
+    def __len__(self):
+        return len(self.array)
+
+    @property
+    def fields(self):
+        """RECORD_FIELDS, seguidos dos campos de --enrich se a tabela os tiver"""
+        return list(self.array.dtype.names)
+
+    def categories(self, name):
+        if name != "language":
+            raise ValueError(f"A coluna {name} não é categórica.")
+        return self.languages
+
+    def raw_column(self, name):
+        """Campo do array estruturado, sem cópia (a linguagem como códigos inteiros)"""
+        return self.array[name]
+
+    def column(self, name):
+        """Valores de uma coluna como listas ou arrays comuns (linguagens e datas decodificadas)"""
+        if name == "language":
+            return np.asarray(self.languages, dtype=object)[self.array["language"]]
+        if name in TIMESTAMP_FIELDS:
+            return format_timestamps(self.array[name])
+        if name == "release_interval_days":
+            # Sem ao menos duas releases o intervalo é indefinido: None, como no registro original
+            values = self.array[name].astype(object)
+            values[np.isnan(self.array[name])] = None
+            return values
+        return self.array[name]
+
+    def rows(self, chunk_size=10000):
+        """Linhas como tuplas de tipos nativos do Python, na ordem de fields (convertidas em blocos)"""
+        for start in range(0, len(self.array), chunk_size):
+            chunk = RepositoryTable(self.array[start:start + chunk_size], self.languages)
+            values = [chunk.column(name) for name in self.fields]
+            yield from zip(*[value.tolist() if isinstance(value, np.ndarray) else value for value in values])
+
+    def __iter__(self):
+        for row in self.rows():
+            yield RepositoryRecord(*row)
+
+    def __getitem__(self, index):
+        return next(iter(RepositoryTable(self.array[[index]], self.languages)))
+
+    def to_dicts(self):
+        """Lista de dicts, para quem precisa acrescentar campos (ex.: --enrich) ou mesclar registros"""
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in self.rows()]
+
+def compact_records(records):
+    """Tabela compacta a partir de dicts; registros antigos sem algum campo continuam como lista"""
+    records = list(records)
+    try:
+        return RepositoryTable.from_records(records)
+    except (KeyError, TypeError, ValueError):
+        return records
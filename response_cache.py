@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIRECTORY = ".graphql_cache"
+DEFAULT_TTL = 24 * 3600
+# TTL por campo raiz da consulta: buscas mudam mais rápido que dados de um repositório
+DEFAULT_TTL_OVERRIDES = {"search": 6 * 3600, "repository": 7 * 24 * 3600}
+
+def normalize_query(query):
+    """Remove diferenças de espaçamento/indentação que não mudam a consulta"""
+    return " ".join(query.split())
+
+def cache_key(query, variables=None):
+    content = normalize_query(query) + "\n" + json.dumps(variables or {}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Cache em disco de respostas GraphQL, endereçado pelo conteúdo da consulta.
+
+    Entradas expiram pelo TTL (exceto no modo offline, que serve qualquer entrada e nunca
+    acessa a rede) e as menos usadas recentemente são removidas quando o tamanho passa de max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, ttl=DEFAULT_TTL, ttl_overrides=None,
+                 max_bytes=512 * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.ttl_overrides = DEFAULT_TTL_OVERRIDES if ttl_overrides is None else ttl_overrides
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(path) for path in self._entries())
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def ttl_for(self, query):
+        normalized = normalize_query(query)
+        for field, ttl in self.ttl_overrides.items():
+            if f"{field}(" in normalized:
+                return ttl
+        return self.ttl
+
+    def get(self, query, variables=None):
+        path = self._path(cache_key(query, variables))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        if not self.offline and time.time() - entry["stored_at"] > self.ttl_for(query):
+            with self.lock:
+                self.misses += 1
+            return None
+        # Atualiza o horário de acesso, usado pela remoção LRU
+        os.utime(path)
+        with self.lock:
+            self.hits += 1
+        return entry["payload"]
+
+    def put(self, query, payload, variables=None):
+        if self.offline or payload.get("errors"):
+            return
+        path = self._path(cache_key(query, variables))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "payload": payload}, f, ensure_ascii=False)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temporary, path)
+        with self.lock:
+            self.total_bytes += os.path.getsize(path) - previous
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove as entradas acessadas há mais tempo até caber em 90% do limite"""
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        for path in entries:
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            size = os.path.getsize(path)
+            os.remove(path)
+            self.total_bytes -= size
+
+    def report(self):
+        print(f"Cache de respostas: {self.hits} acertos, {self.misses} faltas, "
+              f"{self.total_bytes / 1024 / 1024:.1f} MB em {self.directory}.")
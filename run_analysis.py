@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 import os
 import sys
+import hashlib
 import subprocess
+import argparse
+
+REQUIREMENTS_FILE = "requirements.txt"
+# Hash do requirements.txt da última instalação bem-sucedida, guardado no próprio ambiente
+REQUIREMENTS_STAMP = os.path.join(sys.prefix, ".lab1_requirements.sha256")
 
 def check_environment():
     """Verifica se o ambiente virtual existe e está ativado"""
@@ -28,19 +34,43 @@ def check_environment():
     
     return True
 
+def requirements_hash():
+    with open(REQUIREMENTS_FILE, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def requirements_installed():
+    """Verdadeiro se o requirements.txt não mudou desde a última instalação neste ambiente"""
+    try:
+        with open(REQUIREMENTS_STAMP, "r", encoding="utf-8") as f:
+            return f.read().strip() == requirements_hash()
+    except OSError:
+        return False
+
 def install_requirements():
     """Instala os pacotes necessários do requirements.txt"""
     print("Instalando dependências...")
     try:
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], check=True)
-        return True
+        subprocess.run([sys.executable, "-m", "pip", "install", "-r", REQUIREMENTS_FILE], check=True)
     except subprocess.CalledProcessError:
         print("Erro ao instalar dependências.")
         return False
+    try:
+        with open(REQUIREMENTS_STAMP, "w", encoding="utf-8") as f:
+            f.write(requirements_hash())
+    except OSError:
+        # Sem permissão de escrita no ambiente: apenas reinstala na próxima vez
+        pass
+    return True
+
+def ensure_requirements(force=False):
+    """Verifica o ambiente e instala as dependências só quando o requirements.txt mudou"""
+    if not force and requirements_installed():
+        return True
+    return check_environment() and install_requirements()
 
 def check_token():
     """Verifica se o token do GitHub está configurado"""
-    token = os.environ.get("GITHUB_TOKEN")
+    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GITHUB_TOKENS") or os.environ.get("GITHUB_TOKENS_FILE")
     if not token:
         print("\nToken do GitHub não configurado!")
         print("Por favor, defina a variável de ambiente GITHUB_TOKEN antes de executar o script.")
@@ -51,41 +81,71 @@ def check_token():
         return False
     return True
 
-def run_data_collection():
-    """Executa o script de coleta de dados"""
+def run_data_collection(argv=()):
+    """Executa a coleta de dados no próprio processo"""
     print("\nIniciando coleta de dados...")
+    import github_repos_data
     try:
-        subprocess.run([sys.executable, "github_repos_data.py"], check=True)
+        github_repos_data.main(list(argv))
         return True
-    except subprocess.CalledProcessError:
-        print("Erro durante a coleta de dados.")
+    except SystemExit as e:
+        return not e.code
+    except Exception as e:
+        print(f"Erro durante a coleta de dados: {str(e)}")
         return False
 
-def run_data_analysis():
-    """Executa o script de análise de dados"""
+def run_data_analysis(argv=()):
+    """Executa a análise de dados no próprio processo"""
     print("\nIniciando análise dos dados...")
+    import analyze_data
     try:
-        subprocess.run([sys.executable, "analyze_data.py"], check=True)
+        analyze_data.main(list(argv))
         return True
-    except subprocess.CalledProcessError:
-        print("Erro durante a análise dos dados.")
-        return False
+    except SystemExit as e:
+        return not e.code
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Laboratório 1 - coleta e análise de repositórios populares",
+        epilog="Sem subcomando, abre o menu interativo. Argumentos extras são repassados a github_repos_data.py "
+               "(collect, all) ou a analyze_data.py (analyze), ex.: run_analysis.py all --total 0 --engine async.")
+    parser.add_argument("command", nargs="?", choices=["collect", "analyze", "all"],
+                        help="collect: só coleta; analyze: só análise; all: coleta e análise")
+    parser.add_argument("--engine", choices=["serial", "sharded", "async"], default="serial",
+                        help="motor de coleta usado por github_repos_data.py")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="na análise, gera só o sumário em texto, sem gráficos (não carrega o matplotlib)")
+    parser.add_argument("--force-install", action="store_true",
+                        help="reinstala as dependências mesmo que o requirements.txt não tenha mudado")
+    return parser.parse_known_args(argv)
+
+def main(argv=None):
     """Função principal que orquestra o processo completo"""
-    print("=== Laboratório 1 - Experimentação: Características de Repositórios Populares ===\n")
-    
-    # Verificar e configurar ambiente
-    if not check_environment():
-        return
+    args, extra = parse_args(argv)
+    collect_args = ["--engine", args.engine] + (extra if args.command in ("collect", "all") else [])
+    analyze_args = (["--summary-only"] if args.summary_only else []) + (extra if args.command == "analyze" else [])
+    if extra and args.command is None:
+        print(f"Argumentos não reconhecidos: {' '.join(extra)}")
+        return 2
+
+    if args.command is None:
+        print("=== Laboratório 1 - Experimentação: Características de Repositórios Populares ===\n")
     
-    # Instalar dependências
-    if not install_requirements():
-        return
+    # Verificar ambiente e instalar dependências só se o requirements.txt mudou
+    if not ensure_requirements(args.force_install):
+        return 1
     
-    # Verificar token do GitHub
-    if not check_token():
-        return
+    # Verificar token do GitHub (não é necessário para a análise nem no modo offline)
+    if (args.command != "analyze" and "--offline" not in extra and "--tokens-file" not in extra
+            and not check_token()):
+        return 1
+
+    if args.command == "collect":
+        return 0 if run_data_collection(collect_args) else 1
+    if args.command == "analyze":
+        return 0 if run_data_analysis(analyze_args) else 1
+    if args.command == "all":
+        return 0 if run_data_collection(collect_args) and run_data_analysis(analyze_args) else 1
     
     # Menu de opções
     print("\nO que você deseja fazer?")
@@ -97,16 +157,17 @@ def main():
     choice = input("Escolha uma opção (1-4): ")
     
     if choice == '1':
-        run_data_collection()
+        run_data_collection(collect_args)
     elif choice == '2':
-        run_data_analysis()
+        run_data_analysis(analyze_args)
     elif choice == '3':
-        if run_data_collection():
-            run_data_analysis()
+        if run_data_collection(collect_args):
+            run_data_analysis(analyze_args)
     elif choice == '4':
         print("Saindo...")
     else:
         print("Opção inválida!")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import json
+import random
+
+# Métricas com quantis aproximados (as mesmas das RQs 01-04 e 06)
+SKETCH_METRICS = [
+    "age_days",
+    "merged_pull_requests",
+    "releases_count",
+    "days_since_last_update",
+    "issues_closed_ratio",
+]
+SKETCH_QUANTILES = (0.5, 0.9, 0.99)
+
+def normalized_rank_error(k):
+    """Erro de posto normalizado (confiança ~99%) de um sketch KLL com parâmetro k"""
+    return 2.296 / k ** 0.9723
+
+class KLLSketch:
+    """Sketch de quantis KLL: memória O(k), atualizável item a item e mesclável entre execuções.
+
+    Cada nível h guarda itens de peso 2^h. Quando um nível estoura sua capacidade ele é
+    ordenado e metade dos itens (posições pares ou ímpares, ao acaso) sobe para o nível seguinte.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self.min = None
+        self.max = None
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth))
+
+    def update(self, value):
+        value = float(value)
+        self.levels[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.levels[0]) >= self.capacity(0):
+            self.compress()
+
+    def update_many(self, values):
+        for value in values:
+            self.update(value)
+
+    def compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self.capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[level])
+            # Com quantidade ímpar, um item fica no nível atual
+            keep = [items.pop()] if len(items) % 2 else []
+            offset = random.randint(0, 1)
+            self.levels[level + 1].extend(items[offset::2])
+            self.levels[level] = keep
+
+    def merge(self, other):
+        """Incorpora outro sketch (de outra partição, snapshot ou execução)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.compress()
+        return self
+
+    def quantile(self, q):
+        if self.n == 0:
+            return None
+        weighted = sorted((value, 2 ** level) for level, items in enumerate(self.levels) for value in items)
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative > target:
+                return value
+        return self.max
+
+    def rank_error(self):
+        return normalized_rank_error(self.k)
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, value):
+        sketch = cls(value["k"])
+        sketch.n = value["n"]
+        sketch.min = value["min"]
+        sketch.max = value["max"]
+        sketch.levels = [list(items) for items in value["levels"]]
+        return sketch
+
+class SketchSet:
+    """Um sketch KLL por métrica das RQs"""
+
+    def __init__(self, k=200):
+        self.sketches = {name: KLLSketch(k) for name in SKETCH_METRICS}
+
+    def update(self, record):
+        for name, sketch in self.sketches.items():
+            sketch.update(record[name])
+
+    def update_columns(self, arrays):
+        """Atualiza a partir de colunas já carregadas ({métrica: valores})"""
+        for name, sketch in self.sketches.items():
+            sketch.update_many(arrays[name])
+
+    def observe(self, records):
+        """Atualiza os sketches enquanto repassa os registros (para uso no pipeline em streaming)"""
+        for record in records:
+            self.update(record)
+            yield record
+
+    def merge(self, other):
+        for name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[name])
+        return self
+
+    def summary(self, quantiles=SKETCH_QUANTILES):
+        """{métrica: {"n", "quantiles": {q: valor}, "rank_error"}}"""
+        return {
+            name: {
+                "n": sketch.n,
+                "quantiles": {q: sketch.quantile(q) for q in quantiles},
+                "rank_error": sketch.rank_error(),
+            }
+            for name, sketch in self.sketches.items()
+        }
+
+    def save(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({name: sketch.to_dict() for name, sketch in self.sketches.items()}, f)
+        print(f"Sketches de quantis salvos em {filename}")
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        sketch_set = cls()
+        sketch_set.sketches = {name: KLLSketch.from_dict(stored[name]) for name in SKETCH_METRICS}
+        return sketch_set
+
+def merge_sketch_files(filenames):
+    """Mescla os sketches de várias execuções/snapshots em um único conjunto global"""
+    merged = None
+    for filename in filenames:
+        sketch_set = SketchSet.load(filename)
+        merged = sketch_set if merged is None else merged.merge(sketch_set)
+    return merged
@@ -0,0 +1,220 @@
+import datetime
+import sqlite3
+from collections.abc import Mapping
+
+import numpy as np
+
+from stats_engine import DEFAULT_PERCENTILES, RQ_METRICS, RQStatistics
+
+DATABASE_FILE = "repositories.db"
+# Colunas numéricas guardadas em cada snapshot (a linguagem fica à parte, por ser texto)
+SNAPSHOT_COLUMNS = [
+    "stars", "updated_at", "age_days", "days_since_last_update", "releases_count",
+    "merged_pull_requests", "total_issues", "closed_issues", "issues_closed_ratio",
+]
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repositories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    url TEXT,
+    created_at TEXT,
+    first_run_id INTEGER,
+    last_run_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS collection_runs (
+    id INTEGER PRIMARY KEY,
+    collected_at TEXT NOT NULL,
+    engine TEXT,
+    repositories INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    run_id INTEGER NOT NULL REFERENCES collection_runs(id),
+    repository_id INTEGER NOT NULL REFERENCES repositories(id),
+    language TEXT,
+    stars INTEGER,
+    updated_at TEXT,
+    age_days INTEGER,
+    days_since_last_update INTEGER,
+    releases_count INTEGER,
+    merged_pull_requests INTEGER,
+    total_issues INTEGER,
+    closed_issues INTEGER,
+    issues_closed_ratio REAL,
+    PRIMARY KEY (run_id, repository_id)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_language ON snapshots(run_id, language);
+CREATE INDEX IF NOT EXISTS idx_snapshots_stars ON snapshots(run_id, stars);
+CREATE INDEX IF NOT EXISTS idx_snapshots_repository ON snapshots(repository_id);
+CREATE INDEX IF NOT EXISTS idx_collection_runs_date ON collection_runs(collected_at);
+"""
+
+class SnapshotColumns(Mapping):
+    """Colunas de um snapshot carregadas sob demanda, uma por vez (ex.: para os histogramas)"""
+
+    def __init__(self, connection, run_id):
+        self.connection = connection
+        self.run_id = run_id
+        self.cache = {}
+
+    def __getitem__(self, column):
+        if column not in RQ_METRICS.values():
+            raise KeyError(column)
+        if column not in self.cache:
+            rows = self.connection.execute(f"SELECT {column} FROM snapshots WHERE run_id = ? ORDER BY rowid",
+                                           (self.run_id,))
+            dtype = float if column == "issues_closed_ratio" else np.int64
+            self.cache[column] = np.fromiter((value for value, in rows), dtype=dtype)
+        return self.cache[column]
+
+    def __iter__(self):
+        return iter(RQ_METRICS.values())
+
+    def __len__(self):
+        return len(RQ_METRICS)
+
+class SnapshotStatistics(RQStatistics):
+    """RQStatistics de um snapshot: também os histogramas são agregados pelo SQLite"""
+
+    def __init__(self, connection, run_id, count, metrics, languages):
+        super().__init__(count, SnapshotColumns(connection, run_id), metrics, languages)
+        self.connection = connection
+        self.run_id = run_id
+
+    def histogram(self, column, bins=20, scale=1):
+        """Mesmas bordas de np.histogram (bins faixas iguais entre o mínimo e o máximo), contadas com GROUP BY"""
+        if column not in RQ_METRICS.values():
+            raise KeyError(column)
+        low, high = self.connection.execute(f"SELECT MIN({column}), MAX({column}) FROM snapshots WHERE run_id = ?",
+                                            (self.run_id,)).fetchone()
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        rows = self.connection.execute(
+            f"""SELECT MIN(CAST(({column} - ?) * ? / (? - ?) AS INTEGER), ?) AS bucket, COUNT(*)
+                FROM snapshots WHERE run_id = ? AND {column} IS NOT NULL GROUP BY bucket""",
+            (low, bins, high, low, bins - 1, self.run_id))
+        counts = np.zeros(bins, dtype=np.int64)
+        for bucket, count in rows:
+            counts[bucket] = count
+        return counts, np.linspace(low, high, bins + 1) * scale
+
+class RepositoryStore:
+    """Banco SQLite com um registro por repositório (upsert por nameWithOwner) e um snapshot por coleta"""
+
+    def __init__(self, filename=DATABASE_FILE):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def begin_run(self, engine=None):
+        """Registra uma nova coleta e devolve seu id"""
+        collected_at = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self.connection:
+            cursor = self.connection.execute("INSERT INTO collection_runs (collected_at, engine) VALUES (?, ?)",
+                                             (collected_at, engine))
+        return cursor.lastrowid
+
+    def add_records(self, run_id, records):
+        """Grava um lote de registros em uma única transação"""
+        records = list(records)
+        if not records:
+            return
+        with self.connection:
+            self.connection.executemany(
+                """INSERT INTO repositories (name, url, created_at, first_run_id, last_run_id)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET url = excluded.url, last_run_id = excluded.last_run_id""",
+                [(record["name"], record["url"], record.get("created_at"), run_id, run_id) for record in records])
+            self.connection.executemany(
+                f"""INSERT OR REPLACE INTO snapshots (run_id, repository_id, language, {", ".join(SNAPSHOT_COLUMNS)})
+                    VALUES (?, (SELECT id FROM repositories WHERE name = ?), ?, {", ".join("?" * len(SNAPSHOT_COLUMNS))})""",
+                [(run_id, record["name"], record["language"], *(record.get(column) for column in SNAPSHOT_COLUMNS))
+                 for record in records])
+
+    def observe(self, run_id, records, batch_size=5000):
+        """Repassa os registros de um gerador, gravando-os em lotes (modo --stream)"""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self.add_records(run_id, batch)
+                batch = []
+            yield record
+        self.add_records(run_id, batch)
+
+    def save_run(self, records, engine=None, batch_size=5000):
+        run_id = self.begin_run(engine)
+        for _ in self.observe(run_id, records, batch_size):
+            pass
+        return self.finish_run(run_id)
+
+    def finish_run(self, run_id):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE collection_runs SET repositories = (SELECT COUNT(*) FROM snapshots WHERE run_id = ?) "
+                "WHERE id = ?", (run_id, run_id))
+        count = self.connection.execute("SELECT repositories FROM collection_runs WHERE id = ?",
+                                        (run_id,)).fetchone()[0]
+        print(f"Snapshot {run_id} com {count} repositórios salvo em {self.filename}")
+        return run_id
+
+    def runs(self):
+        return self.connection.execute(
+            "SELECT id, collected_at, engine, repositories FROM collection_runs ORDER BY collected_at, id").fetchall()
+
+    def latest_run(self):
+        row = self.connection.execute(
+            "SELECT id FROM collection_runs WHERE repositories > 0 ORDER BY collected_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def order_statistics(self, run_id, column, indexes):
+        """Valores nas posições pedidas da coluna ordenada, com uma única ordenação dentro do SQLite"""
+        indexes = sorted(set(indexes))
+        rows = self.connection.execute(
+            f"""SELECT position, value FROM (
+                    SELECT {column} AS value, ROW_NUMBER() OVER (ORDER BY {column}) - 1 AS position
+                    FROM snapshots WHERE run_id = ?
+                ) WHERE position IN ({", ".join("?" * len(indexes))})""", (run_id, *indexes))
+        return dict(rows.fetchall())
+
+    def statistics(self, run_id=None, percentiles=DEFAULT_PERCENTILES):
+        """Métricas das RQs de um snapshot calculadas por agregações SQL, no mesmo formato de compute_statistics"""
+        run_id = run_id or self.latest_run()
+        count = self.connection.execute("SELECT COUNT(*) FROM snapshots WHERE run_id = ?", (run_id,)).fetchone()[0]
+        if count == 0:
+            return None
+        metrics = {}
+        for column in RQ_METRICS.values():
+            mean = self.connection.execute(f"SELECT AVG({column}) FROM snapshots WHERE run_id = ?",
+                                           (run_id,)).fetchone()[0]
+            # Mesmos postos de stats_engine.order_statistics: mediana superior e posto mais próximo
+            positions = {p: min(count - 1, int(p / 100 * count)) for p in percentiles}
+            values = self.order_statistics(run_id, column, [count // 2, *positions.values()])
+            metrics[column] = {
+                "mean": mean,
+                "median": values[count // 2],
+                "percentiles": {p: values[position] for p, position in positions.items()},
+            }
+        # Empates na ordem de gravação, como count_languages
+        languages = self.connection.execute(
+            """SELECT language, COUNT(*) FROM snapshots WHERE run_id = ?
+               GROUP BY language ORDER BY COUNT(*) DESC, MIN(rowid)""", (run_id,)).fetchall()
+        return SnapshotStatistics(self.connection, run_id, count, metrics, languages)
+
+    def history(self):
+        """Médias das métricas das RQs em cada snapshot, para acompanhar a evolução entre coletas"""
+        averages = ", ".join(f"AVG(s.{column})" for column in RQ_METRICS.values())
+        rows = self.connection.execute(
+            f"""SELECT r.id, r.collected_at, COUNT(*), {averages}
+                FROM collection_runs r JOIN snapshots s ON s.run_id = r.id
+                GROUP BY r.id ORDER BY r.collected_at, r.id""").fetchall()
+        return [
+            {"run_id": run_id, "collected_at": collected_at, "count": count,
+             "means": dict(zip(RQ_METRICS.values(), means))}
+            for run_id, collected_at, count, *means in rows
+        ]
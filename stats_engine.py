@@ -0,0 +1,97 @@
+from collections import Counter
+
+import numpy as np
+
+from ingest import ENRICHMENT_FIELDS
+from records import RepositoryTable
+from storage import ColumnarDataset
+
+# Colunas numéricas usadas pelas RQs 01-04 e 06
+RQ_METRICS = {
+    "rq01": "age_days",
+    "rq02": "merged_pull_requests",
+    "rq03": "releases_count",
+    "rq04": "days_since_last_update",
+    "rq06": "issues_closed_ratio",
+}
+DEFAULT_PERCENTILES = (10, 25, 75, 90, 99)
+# Conjuntos com arrays prontos por coluna (raw_column/categories)
+COLUMNAR_TYPES = (ColumnarDataset, RepositoryTable)
+
+class RQStatistics:
+    """Resultado único da análise: lido pelo console, pelos gráficos e pelo sumário"""
+
+    def __init__(self, count, arrays, metrics, languages):
+        self.count = count
+        self.arrays = arrays
+        self.metrics = metrics
+        self.languages = languages
+
+    def mean(self, column):
+        return self.metrics[column]["mean"]
+
+    def median(self, column):
+        return self.metrics[column]["median"]
+
+    def percentile(self, column, percentile):
+        return self.metrics[column]["percentiles"][percentile]
+
+    def top_languages(self, limit=10):
+        return self.languages[:limit]
+
+    def histogram(self, column, bins=20, scale=1):
+        """Contagens e bordas do histograma de uma coluna, com as bordas multiplicadas por scale"""
+        counts, edges = np.histogram(np.asarray(self.arrays[column]), bins=bins)
+        return counts, edges * scale
+
+def to_arrays(data, columns):
+    """Converte as colunas pedidas em arrays NumPy uma única vez (sem cópia no formato colunar)"""
+    if isinstance(data, COLUMNAR_TYPES):
+        return {name: data.raw_column(name) for name in columns}
+    return {name: np.fromiter((repo[name] for repo in data), dtype=float if name == "issues_closed_ratio" else np.int64,
+                              count=len(data))
+            for name in columns}
+
+def enrichment_arrays(data):
+    """Colunas de --enrich presentes nos dados, como float (intervalo ausente = NaN)"""
+    if isinstance(data, ColumnarDataset):
+        names = [name for name in ENRICHMENT_FIELDS if name in data.schema["columns"]]
+    elif isinstance(data, RepositoryTable):
+        names = [name for name in ENRICHMENT_FIELDS if name in data.fields]
+    else:
+        names = [name for name in ENRICHMENT_FIELDS if len(data) and name in data[0]]
+    if isinstance(data, COLUMNAR_TYPES):
+        return {name: np.asarray(data.raw_column(name), dtype=float) for name in names}
+    return {name: np.array([repo.get(name) for repo in data], dtype=float) for name in names}
+
+def order_statistics(values, percentiles=DEFAULT_PERCENTILES):
+    """Mediana exata e percentis (posto mais próximo) com uma única seleção O(n), sem ordenar"""
+    n = len(values)
+    median_index = n // 2
+    indexes = {p: min(n - 1, int(p / 100 * n)) for p in percentiles}
+    selected = np.partition(np.asarray(values), sorted({median_index, *indexes.values()}))
+    return selected[median_index], {p: selected[i] for p, i in indexes.items()}
+
+def count_languages(data):
+    """Contagem de linguagens em ordem decrescente (empates na ordem de aparição)"""
+    if isinstance(data, COLUMNAR_TYPES):
+        counts = np.bincount(data.raw_column("language"), minlength=len(data.categories("language")))
+        pairs = [(lang, int(count)) for lang, count in zip(data.categories("language"), counts) if count]
+    else:
+        pairs = list(Counter(repo["language"] for repo in data).items())
+    return sorted(pairs, key=lambda pair: pair[1], reverse=True)
+
+def compute_statistics(data, percentiles=DEFAULT_PERCENTILES):
+    """Calcula todas as métricas das RQs em uma passada vetorizada sobre os dados"""
+    arrays = to_arrays(data, RQ_METRICS.values())
+    metrics = {}
+    for name, values in arrays.items():
+        median, selected = order_statistics(values, percentiles)
+        metrics[name] = {"mean": values.mean(), "median": median, "percentiles": selected}
+    # Métricas de --enrich (RQ02/RQ03), só quando os dados as trazem; só os repositórios com valor contam
+    for name, values in enrichment_arrays(data).items():
+        values = values[~np.isnan(values)]
+        if len(values):
+            median, selected = order_statistics(values, percentiles)
+            metrics[name] = {"mean": values.mean(), "median": median, "percentiles": selected}
+    return RQStatistics(len(data), arrays, metrics, count_languages(data))
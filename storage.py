@@ -0,0 +1,238 @@
+import gzip
+import io
+import json
+import os
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+def with_compression_suffix(filename, compression=None):
+    if not compression:
+        return filename
+    return filename + COMPRESSION_SUFFIXES[compression]
+
+def open_text(filename, mode="r"):
+    """Abre um arquivo de texto, com compressão gzip/zstd deduzida pela extensão"""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", encoding="utf-8", newline="")
+    if filename.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Compressão zstd requer o pacote zstandard (pip install zstandard).")
+        if mode == "w":
+            raw = zstandard.ZstdCompressor().stream_writer(open(filename, "wb"), closefd=True)
+        else:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(filename, "rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    return open(filename, mode, encoding="utf-8", newline="")
+
+def iter_jsonl(filename):
+    """Lê um arquivo JSONL (opcionalmente comprimido) registro a registro"""
+    with open_text(filename, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def newest_existing(filenames):
+    """Entre os arquivos existentes, devolve o modificado mais recentemente (ou None)"""
+    existing = [filename for filename in filenames if os.path.exists(filename)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+# Formato colunar: um diretório com schema.json e um arquivo binário bruto por coluna,
+# lido com np.memmap (sem cópia). Colunas de texto usam bytes UTF-8 + offsets; a linguagem
+# é categórica (códigos inteiros + lista de categorias no schema).
+COLUMNS_DIRECTORY = "repositories_data_columns"
+COLUMN_TYPES = {
+    "name": "string",
+    "url": "string",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+    "stars": "int64",
+    "language": "category",
+    "age_days": "int64",
+    "days_since_last_update": "int64",
+    "releases_count": "int64",
+    "merged_pull_requests": "int64",
+    "total_issues": "int64",
+    "closed_issues": "int64",
+    "issues_closed_ratio": "float64",
+}
+# Colunas de --enrich, gravadas só quando presentes nos dados (intervalo ausente = NaN)
+OPTIONAL_COLUMN_TYPES = {
+    "release_interval_days": "float64",
+    "releases_last_year": "int64",
+    "merged_pull_requests_last_year": "int64",
+}
+NUMPY_DTYPES = {"int64": "<i8", "float64": "<f8", "timestamp": "<i8", "category": "<i4"}
+
+def parse_epoch(value):
+    import datetime
+    return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+def format_epoch(value):
+    import datetime
+    return datetime.datetime.fromtimestamp(int(value), datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class ColumnarWriter:
+    """Grava registros no formato colunar em lotes, sem manter o conjunto inteiro em memória"""
+
+    def __init__(self, directory=COLUMNS_DIRECTORY, batch_size=10000, optional_columns=()):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch_size = batch_size
+        self.column_types = dict(COLUMN_TYPES, **{name: OPTIONAL_COLUMN_TYPES[name] for name in optional_columns})
+        self.batch = []
+        self.rows = 0
+        self.categories = {}
+        self.string_sizes = {name: 0 for name, kind in self.column_types.items() if kind == "string"}
+        self.files = {}
+        for name, kind in self.column_types.items():
+            self.files[name] = open(os.path.join(directory, f"{name}.bin"), "wb")
+            if kind == "string":
+                self.files[name + ".offsets"] = open(os.path.join(directory, f"{name}.offsets.bin"), "wb")
+        # Remove o schema antigo: o diretório só é válido depois de close()
+        schema_path = os.path.join(directory, "schema.json")
+        if os.path.exists(schema_path):
+            os.remove(schema_path)
+
+    def append(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def append_columns(self, columns):
+        """Grava um bloco já em colunas (ex.: de ingest.ingest_nodes), sem passar por dicts"""
+        import numpy as np
+        from ingest import parse_timestamps
+
+        self.flush()
+        rows = len(columns["name"])
+        if rows == 0:
+            return
+        for name, kind in self.column_types.items():
+            values = columns[name]
+            if kind == "string":
+                self.write_strings(name, values)
+                continue
+            if kind == "category":
+                codes = self.categories.setdefault(name, {})
+                values = [codes.setdefault(value, len(codes)) for value in values]
+            elif kind == "timestamp":
+                values = parse_timestamps(values).astype(np.int64)
+            self.files[name].write(np.asarray(values, dtype=NUMPY_DTYPES[kind]).tobytes())
+        self.rows += rows
+
+    def write_strings(self, name, values):
+        import numpy as np
+
+        encoded = [(value or "").encode("utf-8") for value in values]
+        lengths = np.fromiter((len(item) for item in encoded), dtype="<i8", count=len(encoded))
+        offsets = self.string_sizes[name] + np.cumsum(lengths)
+        self.files[name].write(b"".join(encoded))
+        self.files[name + ".offsets"].write(offsets.astype("<i8").tobytes())
+        self.string_sizes[name] = int(offsets[-1])
+
+    def flush(self):
+        import numpy as np
+
+        if not self.batch:
+            return
+        for name, kind in self.column_types.items():
+            values = [record.get(name) for record in self.batch]
+            if kind == "string":
+                self.write_strings(name, values)
+                continue
+            if kind == "category":
+                codes = self.categories.setdefault(name, {})
+                values = [codes.setdefault(value, len(codes)) for value in values]
+            elif kind == "timestamp":
+                values = [parse_epoch(value) if value else 0 for value in values]
+            self.files[name].write(np.asarray(values, dtype=NUMPY_DTYPES[kind]).tobytes())
+        self.rows += len(self.batch)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        schema = {
+            "rows": self.rows,
+            "columns": {
+                name: {"type": kind, "categories": list(self.categories.get(name, {}))}
+                if kind == "category" else {"type": kind}
+                for name, kind in self.column_types.items()
+            },
+        }
+        with open(os.path.join(self.directory, "schema.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False, indent=2)
+        print(f"Dados colunares salvos em {self.directory}")
+
+def save_columns(data, directory=COLUMNS_DIRECTORY):
+    """Grava registros (lista de dicts) ou colunas (dict de nome -> valores) no formato colunar"""
+    sample = data if isinstance(data, dict) else (data[0] if data else {})
+    writer = ColumnarWriter(directory, optional_columns=[name for name in OPTIONAL_COLUMN_TYPES if name in sample])
+    if isinstance(data, dict):
+        writer.append_columns(data)
+    else:
+        writer.extend(data)
+    writer.close()
+
+class ColumnarDataset:
+    """Conjunto de dados colunar mapeado em memória; cada coluna só é lida quando pedida"""
+
+    def __init__(self, directory=COLUMNS_DIRECTORY):
+        with open(os.path.join(directory, "schema.json"), "r", encoding="utf-8") as f:
+            self.schema = json.load(f)
+        self.directory = directory
+        self.rows = self.schema["rows"]
+        self.cache = {}
+
+    def __len__(self):
+        return self.rows
+
+    def _memmap(self, filename, dtype):
+        import numpy as np
+
+        path = os.path.join(self.directory, filename)
+        if self.rows == 0 or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def raw_column(self, name):
+        """Array sem cópia: números como estão, categorias como códigos inteiros"""
+        kind = self.schema["columns"][name]["type"]
+        if kind == "string":
+            raise ValueError(f"A coluna {name} é textual; use column().")
+        if name not in self.cache:
+            self.cache[name] = self._memmap(f"{name}.bin", NUMPY_DTYPES[kind])[:self.rows]
+        return self.cache[name]
+
+    def categories(self, name):
+        return self.schema["columns"][name]["categories"]
+
+    def column(self, name):
+        """Valores de uma coluna: arrays mapeados para números, textos decodificados para as demais"""
+        import numpy as np
+
+        kind = self.schema["columns"][name]["type"]
+        if kind == "category":
+            return np.asarray(self.categories(name), dtype=object)[self.raw_column(name)]
+        if kind == "string":
+            data = self._memmap(f"{name}.bin", "u1")
+            offsets = self._memmap(f"{name}.offsets.bin", "<i8")
+            starts = np.concatenate(([0], offsets[:-1]))
+            return [bytes(data[start:end]).decode("utf-8") for start, end in zip(starts, offsets)]
+        if kind == "timestamp":
+            return [format_epoch(value) for value in self.raw_column(name)]
+        return self.raw_column(name)
+
+    def __iter__(self):
+        """Iteração registro a registro (compatibilidade com o código que espera dicts)"""
+        columns = {name: self.column(name) for name in self.schema["columns"]}
+        for i in range(self.rows):
+            yield {name: values[i].item() if hasattr(values[i], "item") else values[i]
+                   for name, values in columns.items()}